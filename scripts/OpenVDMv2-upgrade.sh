@@ -12,9 +12,9 @@ sudo chown -R root:root /usr/local/bin/OVDM_*
 sudo chmod -R 644 /usr/local/bin/OVDM_*
 sudo chmod -R +X /usr/local/bin/OVDM_*
 
-sudo rsync -aiv ../usr/local/bin/openvdm.py /usr/local/bin/
-sudo chown -R root:root /usr/local/bin/openvdm.py
-sudo chmod -R 755 /usr/local/bin/openvdm.py
+sudo rsync -aiv ../usr/local/bin/openvdm*.py /usr/local/bin/
+sudo chown -R root:root /usr/local/bin/openvdm*.py
+sudo chmod -R 755 /usr/local/bin/openvdm*.py
 
 sudo rsync -aiv ../etc/supervisor/conf.d/* /etc/supervisor/conf.d/
 
@@ -272,6 +272,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
     
     
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         self.get_task(current_job)
         payloadObj = json.loads(current_job.data)
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
@@ -320,6 +321,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
         
         jobData = {'cruiseID':'', 'self.cruiseStartDate':''}
@@ -603,6 +605,9 @@ def task_finalizeCurrentCruise(worker, job):
     
     debugPrint("MD5 Summary Task Complete")
 
+    debugPrint("Compacting MD5 Summary journal")
+    completed_job_request = gm_client.submit_job("compactMD5Summary", json.dumps({'cruiseID': worker.cruiseID}))
+
     # need to add code for cruise data transfers
 
     worker.send_job_status(job, 10, 10)
@@ -214,6 +214,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
 
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         self.get_task(current_job)
         payloadObj = json.loads(current_job.data)
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
@@ -256,6 +257,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
 
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
 
         if len(resultsObj['parts']) > 0:
@@ -50,8 +50,8 @@ import sys
 import copy
 import os
 import shutil
-import csv
 from itertools import (takewhile,repeat)
+from openvdm_reader import read_records
 
 # visualizerDataObj = {'data':[], 'unit':'', 'label':''}
 # statObj = {'statName':'', 'statUnit':'', 'statType':'', 'statData':[]}
@@ -124,71 +124,28 @@ def parseFile(filePath):
         (errors, outfile) = csvCleanup(os.path.join(tmpdir, os.path.basename(filePath)))
         debugPrint('Error: ', errors)
 
-    rawIntoDf = {
-        'date_time':[],
-        'Barometer_(mBar)':[],
-        'Air_Temperature_(C)':[],
-        'Relative_Humidity_(%)':[],
-        'Vector_Wind_Speed_(m/s)':[],
-        'Vector_Wind_Direction_(degrees, Relative to Bow)':[],
-        'Scalar_Wind_Speed_(m/s)':[],
-        'Maximum_Wind_Speed_(m/s)':[],
-        'Shortwave_Irradiance_(Wm-2)':[],
-        'Longwave_Irradiance_(Wm-2)':[],
-        'PIR_Thermopile_Voltage_(mV)':[],
-        'PIR_Case_Temperature_(C)':[],
-        'PIR_Dome_Temperature_(C)':[]
-    }
-
-    csvfile = open(outfile, 'r')
-    reader = csv.DictReader( csvfile, RAW_COLUMNS)
-
-    for line in reader:
-
-        try:
-
-            line_date_time = line['date'] + ' ' + line['time']
-
-            line_bar = float(line['Barometer_(mBar)'])
-            line_air_temp = float(line['Air_Temperature_(C)'])
-            line_humid = float(line['Relative_Humidity_(%)'])
-            line_vector_wind_speed = float(line['Vector_Wind_Speed_(m/s)'])
-            line_vector_wind_dir = float(line['Vector_Wind_Direction_(degrees, Relative to Bow)'])
-            line_scalar_wind_speed = float(line['Scalar_Wind_Speed_(m/s)'])
-            line_max_wind_speed = float(line['Maximum_Wind_Speed_(m/s)'])
-            line_shortwave_ir = float(line['Shortwave_Irradiance_(Wm-2)'])
-            line_longwave_ir = float(line['Longwave_Irradiance_(Wm-2)'])
-            line_pir_volts = float(line['PIR_Thermopile_Voltage_(mV)'])
-            line_case_temp = float(line['PIR_Case_Temperature_(C)'])
-            line_dome_temp = float(line['PIR_Dome_Temperature_(C)'])
-
-        except:
-
-            debugPrint('Parsing error: ',line)
-            errors += 1
-
-        else:
-            rawIntoDf['date_time'].append(line_date_time)
-            rawIntoDf['Barometer_(mBar)'].append(line_bar)
-            rawIntoDf['Air_Temperature_(C)'].append(line_air_temp)
-            rawIntoDf['Relative_Humidity_(%)'].append(line_humid)
-            rawIntoDf['Vector_Wind_Speed_(m/s)'].append(line_vector_wind_speed)
-            rawIntoDf['Vector_Wind_Direction_(degrees, Relative to Bow)'].append(line_vector_wind_dir)
-            rawIntoDf['Scalar_Wind_Speed_(m/s)'].append(line_scalar_wind_speed)
-            rawIntoDf['Maximum_Wind_Speed_(m/s)'].append(line_max_wind_speed)
-            rawIntoDf['Shortwave_Irradiance_(Wm-2)'].append(line_shortwave_ir)
-            rawIntoDf['Longwave_Irradiance_(Wm-2)'].append(line_longwave_ir)
-            rawIntoDf['PIR_Thermopile_Voltage_(mV)'].append(line_pir_volts)
-            rawIntoDf['PIR_Case_Temperature_(C)'].append(line_case_temp)
-            rawIntoDf['PIR_Dome_Temperature_(C)'].append(line_dome_temp)
+    (df_proc, parseErrors) = read_records(outfile, RAW_COLUMNS, [
+        'Barometer_(mBar)',
+        'Air_Temperature_(C)',
+        'Relative_Humidity_(%)',
+        'Vector_Wind_Speed_(m/s)',
+        'Vector_Wind_Direction_(degrees, Relative to Bow)',
+        'Scalar_Wind_Speed_(m/s)',
+        'Maximum_Wind_Speed_(m/s)',
+        'Shortwave_Irradiance_(Wm-2)',
+        'Longwave_Irradiance_(Wm-2)',
+        'PIR_Thermopile_Voltage_(mV)',
+        'PIR_Case_Temperature_(C)',
+        'PIR_Dome_Temperature_(C)'
+    ])
+    debugPrint('Parsing errors: ', parseErrors)
+    errors += parseErrors
 
     shutil.rmtree(tmpdir)
 
-    if len(rawIntoDf['date_time']) == 0:
+    if len(df_proc) == 0:
         return None
 
-    df_proc = pd.DataFrame(rawIntoDf)
-
     df_proc['date_time'] = pd.to_datetime(df_proc['date_time'], infer_datetime_format=True)
 
     df_proc = df_proc.join(df_proc['date_time'].diff().to_frame(name='deltaT'))
@@ -0,0 +1,139 @@
+# =================================================================================== #
+#
+#         FILE:  openvdm_geodesic.py
+#
+#        USAGE:  openvdm_geodesic.py [-h] [-n ROWS]
+#
+#  DESCRIPTION:  Vectorized geodesic math used by the *_parser scripts.  Run as a
+#                stand-alone utility it benchmarks great_circle against geopy and
+#                verifies the distances agree within TOLERANCE_NM.
+#
+#      OPTIONS:  [-h] Return the help message.
+#                [-n ROWS] The number of positions to compare, defaults to a day of
+#                1 Hz positions.
+#
+# REQUIREMENTS:  python2.7, Python Modules: numpy, geopy (benchmark only)
+#
+#         BUGS:
+#        NOTES:  Must be kept in the same directory as the *_parser scripts.
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  1.0
+#      CREATED:  2017-04-23
+#     REVISION:  2017-04-23
+#
+# LICENSE INFO:  Open Vessel Data Management v2.2 (OpenVDMv2)
+#                Copyright (C) 2017 OceanDataRat.org
+#
+#    This program is free software: you can redistribute it and/or modify it under the
+#    terms of the GNU General Public License as published by the Free Software
+#    Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful, but WITHOUT ANY
+#    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+#    PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License #    along with
+#    this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =================================================================================== #
+from __future__ import print_function
+import numpy as np
+import argparse
+import sys
+import time
+
+# Same mean earth radius and nautical mile as geopy
+EARTH_RADIUS = 6371.009 # km
+NAUTICAL_MILE = 1.852 # km
+
+# Maximum difference from geopy accepted by the benchmark
+TOLERANCE_NM = 1e-9
+
+def errPrint(*args, **kwargs):
+        print(*args, file=sys.stderr, **kwargs)
+
+def great_circle(lat1, lon1, lat2, lon2):
+
+    # Returns the great-circle distance in nautical miles between positions in
+    # decimal degrees.  Takes scalars, arrays or Series, a NaN position gives a NaN
+    # distance.  Uses the same (Vincenty) spherical formula as geopy's great_circle.
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    deltaLon = np.radians(lon2) - np.radians(lon1)
+
+    sinLat1 = np.sin(lat1)
+    cosLat1 = np.cos(lat1)
+    sinLat2 = np.sin(lat2)
+    cosLat2 = np.cos(lat2)
+    sinDeltaLon = np.sin(deltaLon)
+    cosDeltaLon = np.cos(deltaLon)
+
+    d = np.arctan2(np.sqrt((cosLat2 * sinDeltaLon) ** 2 + (cosLat1 * sinLat2 - sinLat1 * cosLat2 * cosDeltaLon) ** 2), sinLat1 * sinLat2 + cosLat1 * cosLat2 * cosDeltaLon)
+
+    return EARTH_RADIUS * d / NAUTICAL_MILE
+
+def track_distance(latitudes, longitudes):
+
+    # Returns the distance in nautical miles from each position to the previous
+    # one, NaN for the first position.  Takes arrays or Series.
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    distance = np.empty(len(latitudes))
+    distance[:1] = np.nan
+    distance[1:] = great_circle(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+
+    return distance
+
+# -------------------------------------------------------------------------------------
+# Main function of the script should it be run as a stand-alone utility.
+# -------------------------------------------------------------------------------------
+def main(argv):
+
+    parser = argparse.ArgumentParser(description='Benchmark great_circle against geopy')
+    parser.add_argument('-n', '--rows', type=int, default=86400, help=' the number of positions to compare')
+
+    args = parser.parse_args()
+
+    try:
+        from geopy.distance import great_circle as geopy_great_circle
+    except ImportError:
+        errPrint('ERROR: geopy is required to run the benchmark\n')
+        sys.exit(1)
+
+    # A 1 Hz track at up to 20 kts followed by positions scattered over the globe
+    # (antipodes, poles and the antimeridian included)
+    rng = np.random.RandomState(0)
+    trackRows = args.rows // 2
+    latitudes = np.concatenate((rng.uniform(-60, 60) + np.cumsum(rng.uniform(-1, 1, trackRows)) * 20.0 / 3600 / 60, rng.uniform(-90, 90, args.rows - trackRows)))
+    longitudes = np.concatenate((rng.uniform(-170, 170) + np.cumsum(rng.uniform(-1, 1, trackRows)) * 20.0 / 3600 / 60, rng.uniform(-180, 180, args.rows - trackRows)))
+    latitudes[-4:] = [90.0, -90.0, 10.0, -10.0]
+    longitudes[-4:] = [0.0, 45.0, 179.9999, -0.0001]
+
+    startTime = time.time()
+    distance = track_distance(latitudes, longitudes)
+    numpyTime = time.time() - startTime
+
+    startTime = time.time()
+    geopyDistance = np.array([np.nan] + [geopy_great_circle((latitudes[i - 1], longitudes[i - 1]), (latitudes[i], longitudes[i])).nm for i in range(1, len(latitudes))])
+    geopyTime = time.time() - startTime
+
+    maxDifference = np.nanmax(np.abs(distance - geopyDistance))
+
+    print('Positions:      ', len(latitudes))
+    print('geopy:          ', round(geopyTime, 3), 'seconds')
+    print('numpy:          ', round(numpyTime, 3), 'seconds')
+    print('Max difference: ', maxDifference, 'nm')
+
+    if maxDifference > TOLERANCE_NM or np.isnan(distance[1:]).any():
+        errPrint('ERROR: Distances differ from geopy by more than', TOLERANCE_NM, 'nm')
+        sys.exit(1)
+
+    sys.exit(0)
+
+# -------------------------------------------------------------------------------------
+# Required python code for running the script as a stand-alone utility
+# -------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,192 @@
+# =================================================================================== #
+#
+#         FILE:  openvdm_reader.py
+#
+#  DESCRIPTION:  Vectorized reader used by the *_parser scripts to load raw data files
+#                (w/ SCS formatted timestamp) into DataFrames.
+#
+# REQUIREMENTS:  python2.7, Python Modules: csv, numpy, pandas
+#
+#         BUGS:
+#        NOTES:  Must be kept in the same directory as the *_parser scripts.
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  1.0
+#      CREATED:  2017-04-23
+#     REVISION:  2017-04-23
+#
+# LICENSE INFO:  Open Vessel Data Management v2.2 (OpenVDMv2)
+#                Copyright (C) 2017 OceanDataRat.org
+#
+#        NOTES:  Requires Pandas v0.20 or higher
+#
+#    This program is free software: you can redistribute it and/or modify it under the
+#    terms of the GNU General Public License as published by the Free Software
+#    Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful, but WITHOUT ANY
+#    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+#    PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License #    along with
+#    this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =================================================================================== #
+from __future__ import print_function
+import pandas as pd
+import numpy as np
+import csv
+import os
+
+# The number of rows read and parsed at a time
+CHUNK_SIZE = 100000
+
+# Strings float() turns into NaN, to_float does not count them as errors
+NAN_STRINGS = ['nan', '+nan', '-nan']
+
+INT_PATTERN = r'^\s*[-+]?\d+\s*$'
+
+def count_fields(filePath):
+
+    # Returns the number of fields on each line of filePath, 0 for empty lines,
+    # including a last line without a newline.  The file is memory-mapped rather
+    # than read line by line.
+    if os.path.getsize(filePath) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    data = np.memmap(filePath, dtype=np.uint8, mode='r')
+
+    lineEnds = np.flatnonzero(data == ord('\n'))
+    if data[-1] != ord('\n'):
+        lineEnds = np.append(lineEnds, len(data))
+
+    lineStarts = np.append(0, lineEnds[:-1] + 1)
+    lineLengths = lineEnds - lineStarts
+
+    # \r\n line endings
+    lineLengths -= ((lineLengths > 0) & (data[lineEnds - 1] == ord('\r'))).astype(lineLengths.dtype)
+
+    # Fields are never quoted so every comma is a delimiter
+    commas = np.flatnonzero(data == ord(','))
+    fields = np.searchsorted(commas, lineEnds) - np.searchsorted(commas, lineStarts) + 1
+    fields[lineLengths == 0] = 0
+    del data
+
+    return fields
+
+def to_float(values):
+
+    # Converts a Series of strings the way float() would.  Returns (floats, invalid)
+    # where invalid flags the values float() would have rejected.
+    try:
+        return (values.astype(np.float64), values.isnull())
+    except ValueError:
+        pass
+
+    # to_numeric is only used to find the invalid values, it can be off by one ulp
+    # from float()
+    invalid = np.array(pd.to_numeric(values, errors='coerce').isnull())
+    invalid[invalid] = ~values[invalid].str.strip().str.lower().isin(NAN_STRINGS).values
+    invalid = pd.Series(invalid, index=values.index)
+    floats = values.where(~invalid, 'nan').astype(np.float64)
+
+    return (floats, invalid)
+
+def to_int(values):
+
+    # Converts a Series of strings the way int() would.  Returns (floats, invalid),
+    # cast the column to int once the invalid rows have been dropped.
+    invalid = ~values.str.match(INT_PATTERN).fillna(False).astype(bool)
+    ints = pd.to_numeric(values.where(~invalid), errors='coerce').astype(np.float64)
+
+    return (ints, invalid)
+
+def parse_floats(chunk, columns):
+
+    # Returns (records, invalid) for a chunk, records holds the date_time and the
+    # columns converted with float()
+    records = pd.DataFrame({'date_time': chunk['date'] + ' ' + chunk['time']})
+    invalid = pd.Series(False, index=chunk.index)
+
+    for column in columns:
+        (records[column], invalidColumn) = to_float(chunk[column])
+        invalid |= invalidColumn
+
+    return (records, invalid)
+
+def read_records(filePath, rawColumns, usecols, parseChunk=None):
+
+    # Reads the date, time and usecols columns of filePath as strings, CHUNK_SIZE
+    # rows at a time, and passes each chunk to parseChunk(chunk), which returns
+    # (records, invalid) indexed like the chunk.  Rows left out of records are
+    # skipped, rows flagged invalid are dropped and counted as errors.  By default
+    # usecols are converted with float().  Returns (records, errors).
+    if parseChunk is None:
+        parseChunk = lambda chunk: parse_floats(chunk, usecols)
+
+    fields = count_fields(filePath)
+    if len(fields) == 0:
+        return (pd.DataFrame(), 0)
+
+    # Every line is read in full, pandas refuses a chunk narrower than usecols.
+    # Fields past rawColumns are read and ignored, like csv.DictReader does.
+    names = list(rawColumns) + list(range(len(rawColumns), max(len(rawColumns), int(fields.max()))))
+    columns = ['date', 'time'] + [column for column in usecols if column not in ['date', 'time']]
+
+    # Lines cut off before the last column used, csv.DictReader fills the missing
+    # fields with None which the parsers reject
+    minFields = max([rawColumns.index(column) for column in columns]) + 1
+
+    readerArgs = {
+        'header': None,
+        'names': names,
+        'dtype': str,
+        'na_filter': False,
+        'quoting': csv.QUOTE_NONE,
+        'skip_blank_lines': False,
+        'memory_map': True,
+        'chunksize': CHUNK_SIZE
+    }
+
+    try:
+        reader = pd.read_csv(filePath, on_bad_lines='skip', **readerArgs)
+    except TypeError:
+        # pandas < 1.3
+        reader = pd.read_csv(filePath, error_bad_lines=False, warn_bad_lines=False, **readerArgs)
+
+    records = []
+    rows = 0
+    blankRows = 0
+    errors = 0
+
+    for chunk in reader:
+        rows += len(chunk)
+        chunk = chunk[columns]
+
+        blank = np.array(chunk['date'] == '')
+        if blank.any():
+            blank[blank] = (chunk[blank] == '').all(axis=1).values
+            blankRows += int(blank.sum())
+
+        # The chunk index is the line number unless a line could not be split
+        lineNumbers = np.minimum(chunk.index.values, len(fields) - 1)
+        short = ~blank & (fields[lineNumbers] < minFields)
+        errors += int(short.sum())
+
+        if blank.any() or short.any():
+            chunk = chunk[~blank & ~short].copy()
+
+        (chunkRecords, invalid) = parseChunk(chunk)
+        invalid = invalid.reindex(chunkRecords.index)
+
+        errors += int(invalid.sum())
+        records.append(chunkRecords[~invalid])
+
+    # Lines that could not be split into fields and lines where none of the columns
+    # were filled in, empty lines are ignored
+    errors += max(len(fields) - rows, 0) + max(blankRows - int(np.count_nonzero(fields == 0)), 0)
+
+    if len(records) == 0:
+        return (pd.DataFrame(), errors)
+
+    return (pd.concat(records, ignore_index=True), errors)
@@ -38,13 +38,22 @@ import gearman
 import shutil
 import errno
 import json
+import glob
+import tempfile
 import argparse
 import signal
 import pwd
 import grp
 import time
+import imp
+import hashlib
+import sqlite3
+import traceback
 import subprocess
+import multiprocessing
 import openvdm
+from collections import OrderedDict
+from openvdm_scan import scan_dir
 
 customTaskLookup = [
     {
@@ -58,6 +67,20 @@ DEBUG = False
 new_worker = None
 
 dataDashboardManifestFN = 'manifest.json'
+dataDashboardManifestShardPrefix = 'manifest_'
+dashboardCacheFN = '.DashboardData_Cache.db'
+
+# Processing scripts are loaded into the worker as python modules and reused for
+# every file.  A script that defines getDataType(filePath) and parseFile(filePath)
+# is called in-process: getDataType returns the dataType of the file (False if
+# unknown) and parseFile returns the dashboardData object ({'error': ...} if the
+# file could not be processed).  Scripts without these functions, or that can not
+# be loaded, are run as separate python processes instead (--dataType <file>,
+# then <file>, printing the results to stdout).
+#
+# Loaded scripts are kept in processingScripts, keyed by filename: (mtime, module).
+# Each process of the processing pool keeps its own copy.
+processingScripts = {}
 
 def debugPrint(*args, **kwargs):
     global DEBUG
@@ -69,29 +92,12 @@ def errPrint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
-def build_filelist(sourceDir):
-
-    returnFiles = []
-    for root, dirnames, filenames in os.walk(sourceDir):
-        for filename in filenames:
-            returnFiles.append(os.path.join(root, filename))
-
-    returnFiles = [filename.replace(sourceDir + '/', '', 1) for filename in returnFiles]
-    return returnFiles
-
-
 def build_dashboardData_filelist(worker):
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
     dataDashboardDir = os.path.join(cruiseDir, worker.OVDM.getRequiredExtraDirectoryByName('Dashboard Data')['destDir'])
 
-    returnFiles = []
-    for root, dirnames, filenames in os.walk(dataDashboardDir):
-        for filename in filenames:
-            returnFiles.append(os.path.join(root, filename))
-
-    returnFiles = [filename.replace(cruiseDir + '/', '', 1) for filename in returnFiles]
-    return returnFiles
+    return [os.path.relpath(entry.path, cruiseDir) for entry in scan_dir(dataDashboardDir)]
 
 
 def setOwnerGroupPermissions(worker, path):
@@ -173,6 +179,292 @@ def output_JSONDataToFile(worker, filePath, contents):
     return True
 
 
+def build_manifestFilePath(worker, dataDashboardDir, collectionSystemTransfer):
+
+    # Returns the manifest holding the collection system's entries.  When the
+    # manifest is sharded each collection system has its own manifest,
+    # manifest_<destDir>.json, and manifest.json is left empty.
+    if worker.OVDM.getDashboardDataShardManifest():
+        return os.path.join(dataDashboardDir, dataDashboardManifestShardPrefix + collectionSystemTransfer['destDir'].strip('/').replace('/', '_') + '.json')
+
+    return os.path.join(dataDashboardDir, dataDashboardManifestFN)
+
+
+def read_manifest(manifestFilePath):
+
+    # Returns the manifest's entries in an OrderedDict keyed by raw_data, empty if
+    # the manifest does not exist yet.  Raises IOError or ValueError if the
+    # manifest can not be read.
+    if not os.path.isfile(manifestFilePath):
+        return OrderedDict()
+
+    with open(manifestFilePath, 'r') as manifestFile:
+        return OrderedDict((entry['raw_data'], entry) for entry in json.load(manifestFile))
+
+
+def merge_manifest(manifest, newEntries, removeEntries):
+
+    # Removes removeEntries from the manifest and adds newEntries, replacing the
+    # existing entry for the same raw_data in place.  Returns the (added, updated,
+    # removed) entries.
+    added = []
+    updated = []
+    removed = []
+
+    for entry in removeEntries:
+        if manifest.pop(entry['raw_data'], None) is not None:
+            removed.append(entry)
+
+    for entry in newEntries:
+        if entry['raw_data'] in manifest:
+            updated.append(entry)
+        else:
+            added.append(entry)
+
+        manifest[entry['raw_data']] = entry
+
+    return (added, updated, removed)
+
+
+def write_manifest(manifestFilePath, entries):
+
+    # Writes the manifest to a temporary file that is then renamed over the
+    # manifest so readers never see a partially written manifest.
+    tmpFilePath = None
+    try:
+        if not os.path.isdir(os.path.dirname(manifestFilePath)):
+            os.makedirs(os.path.dirname(manifestFilePath))
+
+        (tmpFD, tmpFilePath) = tempfile.mkstemp(prefix='.' + os.path.basename(manifestFilePath) + '.', dir=os.path.dirname(manifestFilePath))
+        with os.fdopen(tmpFD, 'w') as manifestFile:
+            debugPrint("Saving manifest file:", manifestFilePath)
+            json.dump(entries, manifestFile)
+
+        os.chmod(tmpFilePath, 0644)
+        os.rename(tmpFilePath, manifestFilePath)
+
+    except (IOError, OSError) as e:
+        errPrint("Error Saving manifest file:", manifestFilePath + ":", e)
+        if tmpFilePath and os.path.isfile(tmpFilePath):
+            os.remove(tmpFilePath)
+        return False
+
+    return True
+
+
+def load_processingScript(processingScriptFilename):
+
+    # Returns the processing script's module if it provides the in-process entry
+    # points, None otherwise.  The module is reloaded when the script is modified.
+    mtime = os.stat(processingScriptFilename).st_mtime
+
+    if processingScriptFilename in processingScripts and processingScripts[processingScriptFilename][0] == mtime:
+        return processingScripts[processingScriptFilename][1]
+
+    module = None
+    try:
+        debugPrint("Loading processing script:", processingScriptFilename)
+        module = imp.load_source(os.path.splitext(os.path.basename(processingScriptFilename))[0], processingScriptFilename)
+    except (Exception, SystemExit) as e:
+        errPrint("Unable to load processing script", processingScriptFilename + ", running it as a separate process:", e)
+    else:
+        if hasattr(module, 'getDataType') and hasattr(module, 'parseFile'):
+            module.DEBUG = DEBUG
+        else:
+            debugPrint("Processing script does not define getDataType and parseFile, running it as a separate process")
+            module = None
+
+    processingScripts[processingScriptFilename] = (mtime, module)
+    return module
+
+
+def get_dataType(processingScriptFilename, rawFilePath):
+
+    # Returns (dataType, err), dataType is None if it could not be determined
+    module = load_processingScript(processingScriptFilename)
+
+    if module:
+        try:
+            return (module.getDataType(rawFilePath) or None, None)
+        except Exception:
+            return (None, traceback.format_exc())
+
+    command = ['python', processingScriptFilename, '--dataType', rawFilePath]
+
+    s = ' '
+    debugPrint('Get Datatype Command:', s.join(command))
+
+    proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    out, err = proc.communicate()
+
+    return (out.rstrip('\n') or None, err)
+
+
+def get_dashboardData(processingScriptFilename, rawFilePath):
+
+    # Returns (dashboardData, err), dashboardData is None if the processing script
+    # returned nothing.  Raises ValueError if the script printed invalid JSON.
+    module = load_processingScript(processingScriptFilename)
+
+    if module:
+        try:
+            return (module.parseFile(rawFilePath) or None, None)
+        except Exception:
+            return (None, traceback.format_exc())
+
+    command = ['python', processingScriptFilename, rawFilePath]
+
+    s = ' '
+    debugPrint('Processing Command:', s.join(command))
+
+    proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    out, err = proc.communicate()
+
+    if not out:
+        return (None, err)
+
+    return (json.loads(out), err)
+
+
+def process_file(fileEntry):
+
+    # Runs a (processingScriptFilename, rawFilePath) pair through the processing
+    # script.  Returns (dataType, dashboardData, err), dashboardData is None if the
+    # script returned nothing and False if it printed invalid JSON.
+    (processingScriptFilename, rawFilePath) = fileEntry
+
+    dd_type, err = get_dataType(processingScriptFilename, rawFilePath)
+
+    if not dd_type:
+        return (None, None, err)
+
+    try:
+        outObj, err = get_dashboardData(processingScriptFilename, rawFilePath)
+    except ValueError:
+        return (dd_type, False, None)
+
+    return (dd_type, outObj, err)
+
+
+def init_processingPool():
+
+    # The worker's signal handlers only make sense in the worker itself, the pool
+    # is stopped by the worker.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGQUIT, signal.SIG_IGN)
+
+
+def process_files(worker, fileEntries):
+
+    # Yields the process_file results for fileEntries, in the order of fileEntries.
+    # Files are processed in parallel by a pool of processingWorkers processes.
+    # Stops early if the task is stopped.
+    processingWorkers = worker.OVDM.getDashboardDataProcessingWorkers()
+
+    pool = None
+    if processingWorkers > 1 and len(fileEntries) > 1:
+        debugPrint("Processing with", processingWorkers, "processes")
+        pool = multiprocessing.Pool(processingWorkers, init_processingPool)
+        results = pool.imap(process_file, fileEntries)
+    else:
+        results = (process_file(fileEntry) for fileEntry in fileEntries)
+
+    completed = False
+    try:
+        for result in results:
+            yield result
+
+            if worker.stop:
+                debugPrint("Stopping")
+                break
+        else:
+            completed = True
+
+    finally:
+        if pool:
+            if completed:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+
+
+def get_processingScriptsVersion(worker):
+
+    # Returns the md5 of the python files in the processing script directory.  Any
+    # change to a processing script or parser invalidates the dashboard cache.
+    processingScriptDir = worker.OVDM.getDashboardDataProcessingScriptDir()
+
+    scriptsHash = hashlib.md5()
+    for entry in sorted(scan_dir(processingScriptDir), key=lambda entry: entry.relPath):
+        if not entry.name.endswith('.py'):
+            continue
+
+        try:
+            with open(entry.path, 'rb') as scriptFile:
+                scriptsHash.update(entry.relPath + '\0' + scriptFile.read())
+        except IOError:
+            continue
+
+    return scriptsHash.hexdigest()
+
+
+def open_dashboardCache(worker):
+
+    # The dashboard cache records the dataType and dashboardData file produced for
+    # each raw file along with the raw file's size and mtime and the version of the
+    # processing scripts used.  It lives alongside the transfer logs in the
+    # cruise's OpenVDM directory.
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+    dashboardCacheDir = os.path.join(cruiseDir, os.path.dirname(worker.OVDM.getRequiredExtraDirectoryByName('Transfer Logs')['destDir']))
+    dashboardCacheFilepath = os.path.join(dashboardCacheDir, dashboardCacheFN)
+
+    try:
+        dashboardCache = sqlite3.connect(dashboardCacheFilepath)
+        dashboardCache.text_factory = str
+        dashboardCache.execute('CREATE TABLE IF NOT EXISTS files (rawData TEXT PRIMARY KEY, size INTEGER, mtime REAL, scriptsVersion TEXT, dataType TEXT, ddJson TEXT)')
+
+    except sqlite3.Error as e:
+        errPrint("Unable to open dashboard cache", dashboardCacheFilepath + ":", e)
+        return None
+
+    return dashboardCache
+
+
+def lookup_dashboardCache(worker, dashboardCache, rawData, size, mtime, scriptsVersion):
+
+    # Returns the cached (dataType, dd_json) for the raw file, or None unless the
+    # file and processing scripts are unchanged and the dashboardData file still
+    # exists.  dataType and dd_json are None for files of unknown dataType.
+    row = dashboardCache.execute('SELECT size, mtime, scriptsVersion, dataType, ddJson FROM files WHERE rawData = ?', (rawData,)).fetchone()
+
+    if row is None or row[0] != size or row[1] != mtime or row[2] != scriptsVersion:
+        return None
+
+    if row[4] and not os.path.isfile(os.path.join(worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir'], row[4])):
+        return None
+
+    return (row[3], row[4])
+
+
+def update_dashboardCache(dashboardCache, entries, replace=False):
+
+    # Adds (rawData, size, mtime, scriptsVersion, dataType, ddJson) entries to the
+    # cache.  With replace the cache is reduced to just these entries.
+    try:
+        if replace:
+            dashboardCache.execute('DELETE FROM files')
+        dashboardCache.executemany('INSERT OR REPLACE INTO files (rawData, size, mtime, scriptsVersion, dataType, ddJson) VALUES (?, ?, ?, ?, ?, ?)', entries)
+        dashboardCache.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update dashboard cache:", e)
+        return False
+
+    return True
+
+
 class OVDMGearmanWorker(gearman.GearmanWorker):
 
     def __init__(self, host_list=None):
@@ -201,6 +493,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
 
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         self.get_task(current_job)
         payloadObj = json.loads(current_job.data)
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
@@ -241,6 +534,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
 
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
 
         debugPrint("Preparing subsequent Gearman jobs")
@@ -321,8 +615,8 @@ def task_updateDataDashboard(worker, job):
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
     dataDashboardDir = os.path.join(cruiseDir, worker.OVDM.getRequiredExtraDirectoryByName('Dashboard Data')['destDir'])
-    dataDashboardManifestFilePath = os.path.join(dataDashboardDir, dataDashboardManifestFN)
     collectionSystemTransfer = worker.OVDM.getCollectionSystemTransfer(payloadObj['collectionSystemTransferID'])
+    dataDashboardManifestFilePath = build_manifestFilePath(worker, dataDashboardDir, collectionSystemTransfer)
 
     worker.send_job_status(job, 5, 100)
 
@@ -358,70 +652,57 @@ def task_updateDataDashboard(worker, job):
         job_results['parts'].append({"partName": "Retrieve Filelist", "result": "Pass"})
         return json.dumps(job_results)
 
+    # The results are recorded in the dashboard cache so the next rebuild does
+    # not process these files again
+    scriptsVersion = get_processingScriptsVersion(worker)
+    cacheEntries = []
+
+    fileStats = dict((filename, os.stat(os.path.join(cruiseDir, filename))) for filename in fileList)
+    fileList = [filename for filename in fileList if fileStats[filename].st_size > 0]
     fileCount = len(fileList)
-    fileIndex = 0
-    for filename in fileList:
-        
-        if worker.stop:
-            break
+    debugPrint(fileCount, 'non-empty file(s) to process')
+
+    fileEntries = [(processingScriptFilename, os.path.join(cruiseDir, filename)) for filename in fileList]
+
+    for fileIndex, (dd_type, outObj, err) in enumerate(process_files(worker, fileEntries)):
 
+        filename = fileList[fileIndex]
+        fileStat = fileStats[filename]
         debugPrint("Processing file:", filename)
         jsonFileName = os.path.splitext(filename)[0] + '.json'
         rawFilePath = os.path.join(cruiseDir, filename)
         jsonFilePath = os.path.join(dataDashboardDir, jsonFileName)
 
-        if os.stat(rawFilePath).st_size == 0:
-            debugPrint("File is empty")
-            continue
-
-        command = ['python', processingScriptFilename, '--dataType', rawFilePath]
-
-        s = ' '
-        debugPrint(s.join(command))
-
-        proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-        out, err = proc.communicate()
+        worker.send_job_status(job, int(10 + 70*float(fileIndex)/float(fileCount)), 100)
 
-        if out:
-            dd_type = out.rstrip('\n')
+        if dd_type:
             debugPrint("Found to be type:", dd_type)
 
-            command = ['python', processingScriptFilename, rawFilePath]
-
-            s = ' '
-            debugPrint(s.join(command))
+            if outObj is False:
+                errPrint("Error parsing JSON output from file", filename)
+                job_results['parts'].append({"partName": "Parsing JSON output from file " + filename, "result": "Fail"})
 
-            proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-            out, err = proc.communicate()
-
-            if out:
-                try:
-                    debugPrint("Verifying output")
-                    outObj = json.loads(out)
-                except:
-                    errPrint("Error parsing JSON output from file", filename)
-                    job_results['parts'].append({"partName": "Parsing JSON output from file " + filename, "result": "Fail"})
-                    continue
+            elif outObj:
+                if 'error' in outObj:
+                    errorTitle = 'Datafile Parsing error'
+                    errorBody = outObj['error']
+                    errPrint(errorTitle + ': ', errorBody)
+                    worker.OVDM.sendMsg(errorTitle,errorBody)
                 else:
-                    if 'error' in outObj:
+                    if output_JSONDataToFile(worker, jsonFilePath, outObj):
+                        job_results['parts'].append({"partName": "Writing DashboardData file: " + filename, "result": "Pass"})
+                        cacheEntries.append((rawFilePath.replace(baseDir + '/',''), fileStat.st_size, fileStat.st_mtime, scriptsVersion, dd_type, jsonFilePath.replace(baseDir + '/','')))
+                    else:
                         errorTitle = 'Datafile Parsing error'
-                        errorBody = outObj['error']
-                        errPrint(errorTitle + ': ', errorBody)
+                        errorBody = "Error Writing DashboardData file: " + filename
+                        errPrint(errorTitle + ':', errorBody)
                         worker.OVDM.sendMsg(errorTitle,errorBody)
-                    else:
-                        if output_JSONDataToFile(worker, jsonFilePath, outObj):
-                            job_results['parts'].append({"partName": "Writing DashboardData file: " + filename, "result": "Pass"})
-                        else:
-                            errorTitle = 'Datafile Parsing error'
-                            errorBody = "Error Writing DashboardData file: " + filename
-                            errPrint(errorTitle + ':', errorBody)
-                            worker.OVDM.sendMsg(errorTitle,errorBody)
-                            job_results['parts'].append({"partName": "Writing Dashboard file: " + filename, "result": "Fail"})
-
-                        newManifestEntries.append({"type":dd_type, "dd_json": jsonFilePath.replace(baseDir + '/',''), "raw_data": rawFilePath.replace(baseDir + '/','')})
+                        job_results['parts'].append({"partName": "Writing Dashboard file: " + filename, "result": "Fail"})
+
+                    newManifestEntries.append({"type":dd_type, "dd_json": jsonFilePath.replace(baseDir + '/',''), "raw_data": rawFilePath.replace(baseDir + '/','')})
             else:
                 errorTitle = 'No JSON output recieved from file'
-                errorBody = 'Parsing Command: ' + s.join(command)
+                errorBody = 'Processing Script: ' + processingScriptFilename + ', File: ' + rawFilePath
                 errPrint(errorTitle + ': ', errorBody)
                 worker.OVDM.sendMsg(errorTitle,errorBody)
                 removeManifestEntries.append({"dd_json": jsonFilePath.replace(baseDir + '/',''), "raw_data": rawFilePath.replace(baseDir + '/','')})
@@ -435,66 +716,49 @@ def task_updateDataDashboard(worker, job):
 
             if err:
                 errPrint(err)
+            else:
+                cacheEntries.append((rawFilePath.replace(baseDir + '/',''), fileStat.st_size, fileStat.st_mtime, scriptsVersion, None, None))
 
-        worker.send_job_status(job, int(10 + 70*float(fileIndex)/float(fileCount)), 100)
-        fileIndex += 1
+    dashboardCache = open_dashboardCache(worker)
+    if dashboardCache:
+        update_dashboardCache(dashboardCache, cacheEntries)
+        dashboardCache.close()
 
     worker.send_job_status(job, 8, 10)
 
-    if len(newManifestEntries) > 0:
+    if len(newManifestEntries) > 0 or len(removeManifestEntries) > 0:
         debugPrint("Updating Manifest file:", dataDashboardManifestFilePath)
 
-        row_removed = 0
-
         try:
-            #debugPrint("Open Dashboard Manifest file:", dataDashboardManifestFilePath)
-            DashboardManifestFile = open(dataDashboardManifestFilePath, 'r')
-
-            existingManifestEntries = json.load(DashboardManifestFile)
+            manifest = read_manifest(dataDashboardManifestFilePath)
 
-        except IOError:
+        except (IOError, ValueError):
             errPrint("Error Reading Dashboard Manifest file")
             job_results['parts'].append({"partName": "Reading pre-existing Dashboard manifest file", "result": "Fail"})
             return json.dumps(job_results)
 
-        finally:
-            #debugPrint("Closing Dashboard Manifest file")
-            DashboardManifestFile.close()
-            job_results['parts'].append({"partName": "Reading pre-existing Dashboard manifest file", "result": "Pass"})
+        job_results['parts'].append({"partName": "Reading pre-existing Dashboard manifest file", "result": "Pass"})
 
         debugPrint("Entries to remove:", json.dumps(removeManifestEntries, indent=2))
-        for removeEntry in removeManifestEntries:
-            for idx, existingEntry in enumerate(existingManifestEntries):
-                if removeEntry['raw_data'] == existingEntry['raw_data']:
-                    del existingManifestEntries[idx]
-                    row_removed += 1
+        debugPrint("Entries to add/update:", json.dumps(newManifestEntries, indent=2))
+        (addedEntries, updatedEntries, removedEntries) = merge_manifest(manifest, newManifestEntries, removeManifestEntries)
 
-                    if os.path.isfile(os.path.join(baseDir,removeEntry['dd_json'])):
-                        os.remove(os.path.join(baseDir,removeEntry['dd_json']))
-                        debugPrint("Orphaned dd_json file deleted")
-                    break
+        for removedEntry in removedEntries:
+            if os.path.isfile(os.path.join(baseDir,removedEntry['dd_json'])):
+                os.remove(os.path.join(baseDir,removedEntry['dd_json']))
+                debugPrint("Orphaned dd_json file deleted")
 
-        debugPrint("Entries to add/update:", json.dumps(newManifestEntries, indent=2))
-        for newEntry in newManifestEntries:
-            updated = False
-            for existingEntry in existingManifestEntries:
-                if newEntry['raw_data'] == existingEntry['raw_data']:
-                    updated = True
-                    job_results['files']['updated'].append(newEntry['dd_json'].replace(worker.cruiseID + '/',''))
-                    break
-
-            if not updated: #added
-                job_results['files']['new'].append(newEntry['dd_json'].replace(worker.cruiseID + '/',''))
-                existingManifestEntries.append(newEntry)
-
-        if len(job_results['files']['new']):
-            debugPrint(len(job_results['files']['new']), "row(s) added")
-        if len(job_results['files']['updated']):
-            debugPrint(len(job_results['files']['updated']), "row(s) updated")
-        if row_removed:
-            debugPrint(row_removed, "row(s) removed")
-
-        if output_JSONDataToFile(worker, dataDashboardManifestFilePath, existingManifestEntries):
+        job_results['files']['new'] = [entry['dd_json'].replace(worker.cruiseID + '/','') for entry in addedEntries]
+        job_results['files']['updated'] = [entry['dd_json'].replace(worker.cruiseID + '/','') for entry in updatedEntries]
+
+        if len(addedEntries):
+            debugPrint(len(addedEntries), "row(s) added")
+        if len(updatedEntries):
+            debugPrint(len(updatedEntries), "row(s) updated")
+        if len(removedEntries):
+            debugPrint(len(removedEntries), "row(s) removed")
+
+        if write_manifest(dataDashboardManifestFilePath, list(manifest.values())):
             job_results['parts'].append({"partName": "Writing Dashboard manifest file", "result": "Pass"})
         else:
             errPrint("Error Writing Dashboard manifest file")
@@ -537,7 +801,30 @@ def task_rebuildDataDashboard(worker, job):
     
     worker.send_job_status(job, 1, 100)
 
-    newManifestEntries = []
+    # The entries for each manifest, manifest.json is always written so it is left
+    # empty when the manifest is sharded
+    manifests = OrderedDict([(dataDashboardManifestFilePath, [])])
+
+    # Files that have not changed since they were last processed, with processing
+    # scripts that have not changed either, are taken from the dashboard cache
+    # unless the job's payload asks for a forced rebuild ("force": true, sent by
+    # the Reprocess All button of the Rebuild Data Dashboard task).
+    try:
+        force = payloadObj['force'] == True
+    except KeyError:
+        force = False
+
+    scriptsVersion = get_processingScriptsVersion(worker)
+    dashboardCache = open_dashboardCache(worker)
+    cacheEntries = []
+    cachedFiles = {}
+
+    # Collect the files from every collection system first so they are processed
+    # as a single batch, in the same order as before.
+    fileList = []
+    fileEntries = []
+    fileStats = []
+    fileManifests = []
 
     collectionSystemTransferCount = len(collectionSystemTransfers)
     collectionSystemTransferIndex = 0
@@ -548,125 +835,137 @@ def task_rebuildDataDashboard(worker, job):
         processingScriptFilename = os.path.join(worker.OVDM.getDashboardDataProcessingScriptDir(), collectionSystemTransfer['name'].replace(' ','-') + worker.OVDM.getDashboardDataProcessingScriptSuffix())
         debugPrint("Processing Script Filename: " + processingScriptFilename)
 
+        worker.send_job_status(job, int(1 + (9*float(collectionSystemTransferIndex)/float(collectionSystemTransferCount))), 100)
+        collectionSystemTransferIndex += 1
+
         if not os.path.isfile(processingScriptFilename):
             debugPrint("Processing script for collection system not found, moving on.")
-            worker.send_job_status(job, int(10 + (80*float(collectionSystemTransferIndex)/float(collectionSystemTransferCount))), 100)
-            collectionSystemTransferIndex += 1
             continue
 
         collectionSystemTransferInputDir = os.path.join(cruiseDir, collectionSystemTransfer['destDir'])
-        collectionSystemTransferOutputDir = os.path.join(dataDashboardDir, collectionSystemTransfer['destDir'])
-        
+        manifestFilePath = build_manifestFilePath(worker, dataDashboardDir, collectionSystemTransfer)
+
         #build filelist
-        fileList = build_filelist(collectionSystemTransferInputDir)
-        fileList = [os.path.join(collectionSystemTransfer['destDir'], filename) for filename in fileList]
+        for entry in scan_dir(collectionSystemTransferInputDir):
+            if entry.size == 0:
+                continue
 
-        debugPrint("FileList:", json.dumps(fileList, indent=2))
+            filename = os.path.join(collectionSystemTransfer['destDir'], entry.relPath)
 
-        fileCount = len(fileList)
-        fileIndex = 0
-        debugPrint(fileCount, 'file(s) to process')
+            if dashboardCache and not force:
+                cached = lookup_dashboardCache(worker, dashboardCache, os.path.join(worker.cruiseID, filename), entry.size, entry.mtime, scriptsVersion)
+                if cached:
+                    cachedFiles[len(fileList)] = cached
 
-        for filename in fileList:
-        
-            if worker.stop:
-                break
+            fileList.append(filename)
+            fileEntries.append((processingScriptFilename, entry.path))
+            fileStats.append((entry.size, entry.mtime))
+            fileManifests.append(manifestFilePath)
 
-            debugPrint("Processing file:", filename)
-            jsonFileName = os.path.splitext(filename)[0] + '.json'
-            #debugPrint('jsonFileName:', jsonFileName)
-            rawFilePath = os.path.join(cruiseDir, filename)
-            #debugPrint('rawFilePath:', rawFilePath)
-            jsonFilePath = os.path.join(dataDashboardDir, jsonFileName)
-            #debugPrint('jsonFilePath:', jsonFilePath)
+    fileCount = len(fileList)
+    debugPrint(fileCount, 'non-empty file(s),', len(cachedFiles), 'unchanged since they were last processed')
 
-            if os.stat(rawFilePath).st_size == 0:
-                debugPrint("File is empty")
-                continue
+    results = process_files(worker, [fileEntry for (fileIndex, fileEntry) in enumerate(fileEntries) if fileIndex not in cachedFiles])
+
+    for fileIndex, filename in enumerate(fileList):
 
-            command = ['python', processingScriptFilename, '--dataType', rawFilePath]
+        jsonFileName = os.path.splitext(filename)[0] + '.json'
+        rawFilePath = os.path.join(cruiseDir, filename)
+        jsonFilePath = os.path.join(dataDashboardDir, jsonFileName)
+        (size, mtime) = fileStats[fileIndex]
 
-            s = ' '
-            debugPrint('Get Datatype Command:', s.join(command))
+        worker.send_job_status(job, int(10 + 80*float(fileIndex)/float(fileCount)), 100)
 
-            proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-            out, err = proc.communicate()
+        if fileIndex in cachedFiles:
+            (dd_type, dd_json) = cachedFiles[fileIndex]
+            cacheEntries.append((rawFilePath.replace(baseDir + '/',''), size, mtime, scriptsVersion, dd_type, dd_json))
+            if dd_type:
+                manifests.setdefault(fileManifests[fileIndex], []).append({"type":dd_type, "dd_json": dd_json, "raw_data": rawFilePath.replace(baseDir + '/','')})
+            continue
 
-            if out:
-                dd_type = out.rstrip('\n')
-                debugPrint("Found to be type:", dd_type)
+        try:
+            (dd_type, outObj, err) = next(results)
+        except StopIteration:
+            break
 
-                command = ['python', processingScriptFilename, rawFilePath]
+        processingScriptFilename = fileEntries[fileIndex][0]
+        debugPrint("Processing file:", filename)
 
-                s = ' '
-                debugPrint('Processing Command:', s.join(command))
+        if dd_type:
+            debugPrint("Found to be type:", dd_type)
 
-                proc = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-                out, err = proc.communicate()
+            if outObj is False:
+                errorTitle = 'Error parsing output'
+                errorBody = 'Invalid JSON output recieved from processing. Processing Script: ' + processingScriptFilename + ', File: ' + rawFilePath
+                errPrint(errorTitle + ':', errorBody)
+                worker.OVDM.sendMsg(errorTitle,errorBody)
+                job_results['parts'].append({"partName": "Parsing JSON output " + filename, "result": "Fail"})
 
-                if out:
-                    try:
-                        debugPrint("Parsing output")
-                        outObj = json.loads(out)
-                    except:
-                        errorTitle = 'Error parsing output'
-                        errorBody = 'Invalid JSON output recieved from processing. Command: ' + s.join(command)
-                        errPrint(errorTitle + ':', errorBody)
-                        worker.OVDM.sendMsg(errorTitle,errorBody)
-                        job_results['parts'].append({"partName": "Parsing JSON output " + filename, "result": "Fail"})
-                    else:
-                        if 'error' in outObj:
-                            errorTitle = 'Error processing file'
-                            errorBody = outObj['error']
-                            errPrint(errorTitle + ':', errorBody)
-                            worker.OVDM.sendMsg(errorTitle,errorBody)
-                            job_results['parts'].append({"partName": "Processing Datafile " + filename, "result": "Fail"})
-
-                        else:
-                            #job_results['parts'].append({"partName": "Processing Datafile " + filename, "result": "Pass"})
-                            if output_JSONDataToFile(worker, jsonFilePath, outObj):
-                                job_results['parts'].append({"partName": "Writing DashboardData file: " + filename, "result": "Pass"})
-                            else:
-                                errorTitle = 'Error writing file'
-                                errorBody = "Error Writing DashboardData file: " + filename
-                                errPrint(errorTitle + ':', errorBody)
-                                worker.OVDM.sendMsg(errorTitle,errorBody)
-
-                                job_results['parts'].append({"partName": "Writing Dashboard file: " + filename, "result": "Fail"})
-
-                            newManifestEntries.append({"type":dd_type, "dd_json": jsonFilePath.replace(baseDir + '/',''), "raw_data": rawFilePath.replace(baseDir + '/','')})
-                else:
+            elif outObj:
+                if 'error' in outObj:
                     errorTitle = 'Error processing file'
-                    errorBody = 'No JSON output recieved from file. Processing Command: ' + s.join(command)
+                    errorBody = outObj['error']
                     errPrint(errorTitle + ':', errorBody)
                     worker.OVDM.sendMsg(errorTitle,errorBody)
-                    job_results['parts'].append({"partName": "Parsing JSON output from file " + filename, "result": "Fail"})
-                    
-                    if err:
-                        errPrint('err:', err)
+                    job_results['parts'].append({"partName": "Processing Datafile " + filename, "result": "Fail"})
+
+                else:
+                    #job_results['parts'].append({"partName": "Processing Datafile " + filename, "result": "Pass"})
+                    if output_JSONDataToFile(worker, jsonFilePath, outObj):
+                        job_results['parts'].append({"partName": "Writing DashboardData file: " + filename, "result": "Pass"})
+                        cacheEntries.append((rawFilePath.replace(baseDir + '/',''), size, mtime, scriptsVersion, dd_type, jsonFilePath.replace(baseDir + '/','')))
+                    else:
+                        errorTitle = 'Error writing file'
+                        errorBody = "Error Writing DashboardData file: " + filename
+                        errPrint(errorTitle + ':', errorBody)
+                        worker.OVDM.sendMsg(errorTitle,errorBody)
 
+                        job_results['parts'].append({"partName": "Writing Dashboard file: " + filename, "result": "Fail"})
+
+                    manifests.setdefault(fileManifests[fileIndex], []).append({"type":dd_type, "dd_json": jsonFilePath.replace(baseDir + '/',''), "raw_data": rawFilePath.replace(baseDir + '/','')})
             else:
-                debugPrint("File is of unknown datatype, moving on")
+                errorTitle = 'Error processing file'
+                errorBody = 'No JSON output recieved from file. Processing Script: ' + processingScriptFilename + ', File: ' + rawFilePath
+                errPrint(errorTitle + ':', errorBody)
+                worker.OVDM.sendMsg(errorTitle,errorBody)
+                job_results['parts'].append({"partName": "Parsing JSON output from file " + filename, "result": "Fail"})
 
                 if err:
                     errPrint('err:', err)
 
-            worker.send_job_status(job, int(10 + 70*float(fileIndex)/float(fileCount)), 100)
-            fileIndex += 1
+        else:
+            debugPrint("File is of unknown datatype, moving on")
 
-        #job_results['parts'].append({"partName": "Processing " + collectionSystemTransfer['name'], "result": "Pass"})
+            if err:
+                errPrint('err:', err)
+            else:
+                cacheEntries.append((rawFilePath.replace(baseDir + '/',''), size, mtime, scriptsVersion, None, None))
 
-        collectionSystemTransferIndex += 1
+    results.close()
+
+    # A complete rebuild replaces the cache so files that no longer exist are
+    # dropped from it
+    if dashboardCache:
+        update_dashboardCache(dashboardCache, cacheEntries, replace=not worker.stop)
+        dashboardCache.close()
 
     worker.send_job_status(job, 90, 100)
 
     debugPrint("Update Dashboard Manifest file")
-    if output_JSONDataToFile(worker, dataDashboardManifestFilePath, newManifestEntries):
-        job_results['parts'].append({"partName": "Updating manifest file", "result": "Pass"})
-    else:
-        errPrint("Error updating manifest file")
-        job_results['parts'].append({"partName": "Updating manifest file", "result": "Fail"})
-        return json.dumps(job_results)
+    for (manifestFilePath, manifestEntries) in manifests.items():
+        if not write_manifest(manifestFilePath, manifestEntries):
+            errPrint("Error updating manifest file")
+            job_results['parts'].append({"partName": "Updating manifest file", "result": "Fail"})
+            return json.dumps(job_results)
+
+    # Remove the manifest shards of collection systems that no longer have any
+    # entries, or all of them if the manifest is no longer sharded
+    for manifestFilePath in glob.glob(os.path.join(dataDashboardDir, dataDashboardManifestShardPrefix + '*.json')):
+        if manifestFilePath not in manifests:
+            debugPrint("Removing manifest file:", manifestFilePath)
+            os.remove(manifestFilePath)
+
+    job_results['parts'].append({"partName": "Updating manifest file", "result": "Pass"})
 
     worker.send_job_status(job, 95, 100)
 
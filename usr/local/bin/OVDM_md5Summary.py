@@ -36,6 +36,7 @@ import os
 import sys
 import gearman
 import shutil
+import tempfile
 import json
 import hashlib
 import signal
@@ -43,13 +44,23 @@ import fnmatch
 import pwd
 import grp
 import time
+import threading
+import sqlite3
 import openvdm
+from multiprocessing.pool import ThreadPool
+from openvdm_hash import hashAlgorithms, new_hash, available_hashAlgorithms, hash_file
+from openvdm_scan import scan_dir, is_internalFile
 
 customTaskLookup = [
     {
         "taskID": "0",
         "name": "updateMD5Summary",
         "longName": "Updating MD5 Summary",
+    },
+    {
+        "taskID": "0",
+        "name": "compactMD5Summary",
+        "longName": "Compacting MD5 Summary",
     }
 ]
 
@@ -58,6 +69,11 @@ new_worker = None
 
 md5SummaryFN = 'MD5_Summary.txt'
 md5SummaryMD5FN = 'MD5_Summary.md5'
+md5HashCacheFN = '.MD5_HashCache.db'
+md5SummaryJournalFN = 'MD5_Summary.journal'
+
+# Minimum number of seconds between hashing throughput updates
+hashStatusInterval = 5
 
 
 def debugPrint(*args, **kwargs):
@@ -70,22 +86,94 @@ def errPrint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
+def get_hashAlgorithms(worker):
+
+    # Returns the configured hash algorithms that are available on this system
+    return available_hashAlgorithms(worker.OVDM.getHashAlgorithms())
+
+
+def build_summaryFilenames(algorithm):
+
+    # Returns the summary, summary checksum and journal filenames for the algorithm
+    summaryPrefix = algorithm.upper() + '_Summary'
+    return (summaryPrefix + '.txt', summaryPrefix + '.' + algorithm, summaryPrefix + '.journal')
+
+
 def build_filelist(worker):
 
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
 
+    summaryFilenames = set()
+    for algorithm in hashAlgorithms:
+        summaryFilenames.update(build_summaryFilenames(algorithm))
+
     returnFiles = []
-    for root, dirnames, filenames in os.walk(cruiseDir):
-        for filename in filenames:
-            if not filename == md5SummaryFN and not filename == md5SummaryMD5FN:
-                returnFiles.append(os.path.join(root, filename))
+    for entry in scan_dir(cruiseDir):
+        if not entry.name in summaryFilenames and not is_internalFile(entry.name):
+            returnFiles.append(worker.cruiseID + '/' + entry.relPath)
 
-    returnFiles = [filename.replace(baseDir + '/', '', 1) for filename in returnFiles]
     return returnFiles
 
 
-def build_hashes(worker, job, fileList):
+def send_hash_status(worker, job, bytesHashed, startTime):
+
+    elapsed = time.time() - startTime
+    bytesPerSec = int(bytesHashed / elapsed) if elapsed > 0 else 0
+    worker.send_job_data(job, json.dumps({'bytesHashed': bytesHashed, 'bytesPerSec': bytesPerSec}))
+    return bytesPerSec
+
+
+def open_hashCache(worker):
+
+    # The hash cache lives alongside the transfer logs in the cruise's OpenVDM
+    # directory.
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+    hashCacheDir = os.path.join(cruiseDir, os.path.dirname(worker.OVDM.getRequiredExtraDirectoryByName('Transfer Logs')['destDir']))
+    hashCacheFilepath = os.path.join(hashCacheDir, md5HashCacheFN)
+
+    try:
+        hashCache = sqlite3.connect(hashCacheFilepath)
+        hashCache.text_factory = str
+        hashCache.execute('CREATE TABLE IF NOT EXISTS fileHashes (filename TEXT, algorithm TEXT, size INTEGER, mtime REAL, inode INTEGER, hash TEXT, PRIMARY KEY (filename, algorithm))')
+
+    except sqlite3.Error as e:
+        errPrint("Unable to open MD5 hash cache", hashCacheFilepath + ":", e)
+        return None
+
+    return hashCache
+
+
+def lookup_hashCache(hashCache, filename, fileStat, algorithms):
+
+    # Returns the cached hashes for the file, or None unless every algorithm is
+    # cached for the file's current size, mtime and inode.
+    cachedHashes = {}
+    for row in hashCache.execute('SELECT algorithm, size, mtime, inode, hash FROM fileHashes WHERE filename = ?', (filename,)):
+        if row[1] == fileStat.st_size and row[2] == fileStat.st_mtime and row[3] == fileStat.st_ino:
+            cachedHashes[row[0]] = row[4]
+
+    if all(algorithm in cachedHashes for algorithm in algorithms):
+        return cachedHashes
+
+    return None
+
+
+def update_hashCache(hashCache, entries):
+
+    try:
+        hashCache.executemany('INSERT OR REPLACE INTO fileHashes (filename, algorithm, size, mtime, inode, hash) VALUES (?, ?, ?, ?, ?, ?)', entries)
+        hashCache.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update MD5 hash cache:", e)
+        return False
+
+    return True
+
+
+def build_hashes(worker, job, fileList, useCache=True, transferHashes={}):
 
     #print sourceDir
     #print json.dumps(fileList, indent=2)
@@ -96,51 +184,130 @@ def build_hashes(worker, job, fileList):
     filesizeLimit = worker.OVDM.getMD5FilesizeLimit()
     filesizeLimitStatus = worker.OVDM.getMD5FilesizeLimitStatus() 
 
-    hashes = []
+    bufferSize = worker.OVDM.getMD5HashBufferSize()
+    hashWorkers = worker.OVDM.getMD5HashWorkers()
 
-    fileCount = len(fileList)
-    index = 0
-    for filename in fileList:
-        #print filename
-        if filesizeLimitStatus == 'On' and not filesizeLimit == '0':
-            if os.stat(os.path.join(baseDir, filename)).st_size < int(filesizeLimit) * 1000000:
-                #debugPrint("Building Hash for:", os.path.join(baseDir, filename))
-                with open(os.path.join(baseDir, filename)) as file_to_check:
+    algorithms = get_hashAlgorithms(worker)
 
-                    # read contents of the file
-                    data = file_to_check.read()    
+    hashCache = open_hashCache(worker)
 
-                    # pipe contents of the file through
-                    hashes.append({'hash': hashlib.md5(data).hexdigest(), 'filename': filename})
+    # Files hashed while they were transferred, or whose size, mtime and inode
+    # match the hash cache, are not re-read
+    fileHashes = {}
+    hashList = []
+    cacheEntries = []
+    cacheHits = 0
+    transferHits = 0
+    for filename in fileList:
+        fileStat = os.stat(os.path.join(baseDir, filename))
 
-                # here's how you get the md5 of the file name... not too useful but was a funny bug caught by Bob Arko.
-                #hashes.append({'hash': hashlib.md5(os.path.join(baseDir, filename)).hexdigest(), 'filename': filename})
-            else:
-                #debugPrint("Skipping Hash for:", os.path.join(baseDir, filename))
-                hashes.append({'hash': '********************************', 'filename': filename})
+        try:
+            transferHash = transferHashes[filename]
+        except KeyError:
+            pass
         else:
-            #debugPrint("Building Hash for:", os.path.join(baseDir, filename))
-            with open(os.path.join(baseDir, filename)) as file_to_check:
+            if transferHash['size'] == fileStat.st_size and transferHash['mtime'] == fileStat.st_mtime and all(algorithm in transferHash['hashes'] for algorithm in algorithms):
+                fileHashes[filename] = transferHash['hashes']
+                for algorithm in algorithms:
+                    cacheEntries.append((filename, algorithm, fileStat.st_size, fileStat.st_mtime, fileStat.st_ino, transferHash['hashes'][algorithm]))
+                transferHits += 1
+                continue
+
+        if filesizeLimitStatus == 'On' and not filesizeLimit == '0' and fileStat.st_size >= int(filesizeLimit) * 1000000:
+            #debugPrint("Skipping Hash for:", os.path.join(baseDir, filename))
+            fileHashes[filename] = dict((algorithm, '*' * len(new_hash(algorithm).hexdigest())) for algorithm in algorithms)
+            continue
+
+        if useCache and hashCache:
+            cachedHashes = lookup_hashCache(hashCache, filename, fileStat, algorithms)
+            if cachedHashes:
+                fileHashes[filename] = cachedHashes
+                cacheHits += 1
+                continue
 
-                # read contents of the file
-                data = file_to_check.read()    
+        hashList.append((filename, fileStat))
 
-                # pipe contents of the file through
-                hashes.append({'hash': hashlib.md5(data).hexdigest(), 'filename': filename})
+    debugPrint(transferHits, "hash(es) provided by the transfer,", cacheHits, "hash(es) retrieved from cache,", len(hashList), "file(s) to hash")
 
-            # here's how you get the md5 of the file name... not too useful but was a funny bug caught by Bob Arko.
-            #hashes.append({'hash': hashlib.md5(os.path.join(baseDir, filename)).hexdigest(), 'filename': filename})
+    # Each hashing thread reuses its own read buffer
+    threadData = threading.local()
+
+    def hash_entry(entry):
+        (filename, fileStat) = entry
+
+        try:
+            threadData.buf
+        except AttributeError:
+            threadData.buf = bytearray(bufferSize)
+
+        #debugPrint("Building Hash for:", os.path.join(baseDir, filename))
+        (hashes, bytesRead) = hash_file(os.path.join(baseDir, filename), threadData.buf, algorithms)
+        return (filename, fileStat, hashes, bytesRead)
+
+    # hashlib releases the GIL while hashing so a thread pool is enough to keep
+    # multiple cores busy.  imap returns the results in the order of hashList.
+    pool = None
+    if hashWorkers > 1 and len(hashList) > 1:
+        debugPrint("Hashing with", hashWorkers, "threads")
+        pool = ThreadPool(hashWorkers)
+        results = pool.imap(hash_entry, hashList)
+    else:
+        results = (hash_entry(entry) for entry in hashList)
+
+    fileCount = len(hashList)
+    index = 0
+    bytesHashed = 0
+    startTime = time.time()
+    lastStatusTime = startTime
+    for (filename, fileStat, hashes, bytesRead) in results:
+        fileHashes[filename] = hashes
+        for algorithm in algorithms:
+            cacheEntries.append((filename, algorithm, fileStat.st_size, fileStat.st_mtime, fileStat.st_ino, hashes[algorithm]))
+        bytesHashed += bytesRead
 
         worker.send_job_status(job, int(20 + 60*float(index)/float(fileCount)), 100)
 
+        if time.time() - lastStatusTime >= hashStatusInterval:
+            send_hash_status(worker, job, bytesHashed, startTime)
+            lastStatusTime = time.time()
+
         if worker.stop:
             debugPrint("Stopping")
             break
 
         index += 1
+
+    if pool:
+        if worker.stop:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+    if hashCache:
+        update_hashCache(hashCache, cacheEntries)
+        hashCache.close()
+
+    cacheLookups = cacheHits + len(hashList) if useCache else 0
+
+    worker.hashStats = {
+        'bytesHashed': bytesHashed,
+        'transferHashes': transferHits,
+        'bytesPerSec': send_hash_status(worker, job, bytesHashed, startTime),
+        'cacheHits': cacheHits,
+        'cacheMisses': cacheLookups - cacheHits,
+        'cacheHitRate': round(float(cacheHits) / cacheLookups, 3) if cacheLookups > 0 else 0.0
+    }
+    debugPrint("Hashed", bytesHashed, "bytes at", worker.hashStats['bytesPerSec'], "bytes/sec")
+    debugPrint("Hash cache hit rate:", worker.hashStats['cacheHitRate'])
     #debugPrint("Finished building hashes")
 
-    return hashes
+    # Returns the hashes grouped by algorithm, each in the order of fileList
+    returnHashes = {}
+    for algorithm in algorithms:
+        returnHashes[algorithm] = [{'hash': fileHashes[filename][algorithm], 'filename': filename} for filename in fileList if filename in fileHashes]
+
+    return returnHashes
 
 
 def setOwnerGroupPermissions(worker, path):
@@ -192,23 +359,136 @@ def setOwnerGroupPermissions(worker, path):
 
     return True
 
-def build_MD5Summary_MD5(worker):
+def read_MD5Summary(md5SummaryFilepath):
+
+    # Returns the contents of a summary or journal file as a filename-keyed index.
+    hashIndex = {}
+
+    with open(md5SummaryFilepath, 'r') as MD5SummaryFile:
+        for line in MD5SummaryFile:
+            (md5Hash, filename) = line.split(' ', 1)
+            hashIndex[filename.rstrip('\n')] = md5Hash
+
+    return hashIndex
+
+
+def write_MD5Summary(worker, md5SummaryFilepath, hashIndex, algorithm='md5'):
+
+    # The summary is written to a temp file in the same directory and renamed into
+    # place so readers never see a partially written file.  Rows are sorted by
+    # filename so the file can be binary-searched and diffed.  The hash of the
+    # summary itself is computed as the rows are written and returned so the
+    # summary does not need to be re-read.
+    (fd, tmpFilepath) = tempfile.mkstemp(prefix='.' + os.path.basename(md5SummaryFilepath) + '.', dir=os.path.dirname(md5SummaryFilepath))
+    md5SummaryMD5 = new_hash(algorithm)
+
+    try:
+        with os.fdopen(fd, 'w') as MD5SummaryFile:
+            for filename in sorted(hashIndex):
+                line = hashIndex[filename] + ' ' + filename + '\n'
+                md5SummaryMD5.update(line)
+                MD5SummaryFile.write(line)
+
+        os.chmod(tmpFilepath, 0644)
+        os.rename(tmpFilepath, md5SummaryFilepath)
+
+    except (IOError, OSError):
+        errPrint("Error saving", algorithm.upper(), "Summary file")
+        if os.path.isfile(tmpFilepath):
+            os.remove(tmpFilepath)
+        return False
+
+    setOwnerGroupPermissions(worker, md5SummaryFilepath)
+    return md5SummaryMD5.hexdigest()
+
+
+def append_MD5SummaryJournal(worker, md5SummaryJournalFilepath, newHashes):
+
+    # Returns the number of records in the journal after the append, False on error.
+    # The count is carried over from the previous append along with the journal's
+    # size.  The journal is only read to count its records when its size shows it
+    # was changed by something else (compaction, another worker, a restart).
+    try:
+        journalSize = 0
+        if os.path.isfile(md5SummaryJournalFilepath):
+            journalSize = os.path.getsize(md5SummaryJournalFilepath)
+
+        (previousSize, journalRecords) = worker.journalRecords.get(md5SummaryJournalFilepath, (0, 0))
+        if journalSize == 0:
+            journalRecords = 0
+        elif journalSize != previousSize:
+            with open(md5SummaryJournalFilepath, 'r') as MD5SummaryJournalFile:
+                journalRecords = sum(1 for line in MD5SummaryJournalFile)
+
+        with open(md5SummaryJournalFilepath, 'a') as MD5SummaryJournalFile:
+            for newHash in newHashes:
+                MD5SummaryJournalFile.write(newHash['hash'] + ' ' + newHash['filename'] + '\n')
+            MD5SummaryJournalFile.flush()
+            os.fsync(MD5SummaryJournalFile.fileno())
+
+        journalRecords += len(newHashes)
+        worker.journalRecords[md5SummaryJournalFilepath] = (os.path.getsize(md5SummaryJournalFilepath), journalRecords)
+
+    except (IOError, OSError):
+        errPrint("Error appending to summary journal", md5SummaryJournalFilepath)
+        return False
+
+    setOwnerGroupPermissions(worker, md5SummaryJournalFilepath)
+    return journalRecords
+
+
+def compact_MD5Summary(worker, algorithm='md5', newHashes=[]):
 
+    # Fold the journal and any new hashes into the canonical summary file, rebuild
+    # the summary checksum file and then discard the journal.  Replaying the
+    # journal is idempotent so a crash part way through is harmless.
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
+    (summaryFN, summaryChecksumFN, summaryJournalFN) = build_summaryFilenames(algorithm)
+    md5SummaryFilepath = os.path.join(cruiseDir, summaryFN)
+    md5SummaryJournalFilepath = os.path.join(cruiseDir, summaryJournalFN)
 
-    md5SummaryFilepath = os.path.join(cruiseDir, md5SummaryFN)
-    md5SummaryMD5Filepath = os.path.join(cruiseDir, md5SummaryMD5FN)
-    with open(md5SummaryFilepath) as file_to_check:
+    try:
+        hashIndex = {}
+
+        # Summaries for newly enabled algorithms start out empty
+        if os.path.isfile(md5SummaryFilepath) or algorithm == 'md5':
+            hashIndex = read_MD5Summary(md5SummaryFilepath)
+        if os.path.isfile(md5SummaryJournalFilepath):
+            hashIndex.update(read_MD5Summary(md5SummaryJournalFilepath))
+
+    except IOError:
+        errPrint("Error Reading", algorithm.upper(), "Summary file")
+        return False
 
-        # read contents of the file
-        data = file_to_check.read()    
+    for newHash in newHashes:
+        hashIndex[newHash['filename']] = newHash['hash']
+
+    md5SummaryMD5Hash = write_MD5Summary(worker, md5SummaryFilepath, hashIndex, algorithm)
+    if not md5SummaryMD5Hash:
+        return False
+
+    if not build_MD5Summary_MD5(worker, algorithm, md5SummaryMD5Hash):
+        return False
 
-        # pipe contents of the file through
-        md5SummaryMD5Hash = hashlib.md5(data).hexdigest()
+    if os.path.isfile(md5SummaryJournalFilepath):
+        os.remove(md5SummaryJournalFilepath)
 
-        # here's how you get the md5 of the file name... not too useful but was a funny bug caught by Bob Arko.
-        #md5SummaryMD5Hash = hashlib.md5(md5SummaryFilepath).hexdigest()
+    return True
+
+
+def build_MD5Summary_MD5(worker, algorithm='md5', md5SummaryMD5Hash=None):
+
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+    (summaryFN, summaryChecksumFN, summaryJournalFN) = build_summaryFilenames(algorithm)
+
+    md5SummaryFilepath = os.path.join(cruiseDir, summaryFN)
+    md5SummaryMD5Filepath = os.path.join(cruiseDir, summaryChecksumFN)
+
+    if not md5SummaryMD5Hash:
+        (hashes, bytesRead) = hash_file(md5SummaryFilepath, bytearray(worker.OVDM.getMD5HashBufferSize()), [algorithm])
+        md5SummaryMD5Hash = hashes[algorithm]
     
     try:
         #debugPrint("Opening MD5 Summary MD5 file")
@@ -218,7 +498,7 @@ def build_MD5Summary_MD5(worker):
         MD5SummaryMD5File.write(md5SummaryMD5Hash)
 
     except IOError:
-        errPrint("Error Saving MD5 Summary MD5 file")
+        errPrint("Error Saving", algorithm.upper(), "Summary", algorithm, "file")
         return False
 
     finally:
@@ -228,6 +508,36 @@ def build_MD5Summary_MD5(worker):
     return True
 
 
+def pending_MD5SummaryJournals(worker):
+
+    # Returns True if any configured algorithm has a journal waiting to be compacted
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+
+    for algorithm in get_hashAlgorithms(worker):
+        if os.path.isfile(os.path.join(cruiseDir, build_summaryFilenames(algorithm)[2])):
+            return True
+
+    return False
+
+
+def compact_MD5SummaryJournals(worker):
+
+    # Compact the journals of every configured algorithm that has one pending
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+
+    compacted = True
+    for algorithm in get_hashAlgorithms(worker):
+        if os.path.isfile(os.path.join(cruiseDir, build_summaryFilenames(algorithm)[2])):
+            debugPrint("Compacting", algorithm.upper(), "summary journal")
+            if not compact_MD5Summary(worker, algorithm):
+                compacted = False
+
+    worker.compactionPending = False
+    return compacted
+
+
 class OVDMGearmanWorker(gearman.GearmanWorker):
     
     def __init__(self, host_list=None):
@@ -237,8 +547,24 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         self.cruiseID = ''
         self.shipboardDataWarehouseConfig = {}
         self.task = None
+        self.hashStats = {}
+        self.compactionPending = False
+        self.journalRecords = {}
+        self.lastJobTime = time.time()
         super(OVDMGearmanWorker, self).__init__(host_list=[self.OVDM.getGearmanServer()])
 
+        # A journal left behind by a previous run of the worker is compacted once
+        # the worker is idle instead of waiting for the cruise to be finalized
+        try:
+            self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
+            self.cruiseID = self.OVDM.getCruiseID()
+            self.compactionPending = pending_MD5SummaryJournals(self)
+        except Exception as e:
+            errPrint("Unable to check for pending MD5 summary journals:", e)
+
+        if self.compactionPending:
+            debugPrint("MD5 summary journal pending from a previous run")
+
 
     def get_task(self, current_job):
         tasks = self.OVDM.getTasks()
@@ -257,16 +583,18 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
+        jobContext = self.OVDM.getJobContext()
         self.get_task(current_job)
         payloadObj = json.loads(current_job.data)
-        self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
+        self.shipboardDataWarehouseConfig = jobContext['warehouseConfig']
 
-        self.cruiseID = self.OVDM.getCruiseID()
+        self.cruiseID = jobContext['cruiseID']
         if len(payloadObj) > 0:
             try:
                 payloadObj['cruiseID']
             except KeyError:
-                self.cruiseID = self.OVDM.getCruiseID()
+                self.cruiseID = jobContext['cruiseID']
             else:
                 self.cruiseID = payloadObj['cruiseID']
 
@@ -297,6 +625,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
 
         if len(resultsObj['parts']) > 0:
@@ -321,6 +650,15 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
     def after_poll(self, any_activity):
         self.stop = False
         self.taskID = '0'
+        if any_activity:
+            self.lastJobTime = time.time()
+        elif self.compactionPending and time.time() - self.lastJobTime >= self.OVDM.getMD5SummaryCompactionIdleTime():
+            debugPrint("Worker idle, compacting MD5 summary journal")
+            try:
+                compact_MD5SummaryJournals(self)
+            except Exception as e:
+                errPrint("Error compacting MD5 summary journal:", e)
+            self.compactionPending = False
         if self.quit:
             errPrint("Quitting")
             self.shutdown()
@@ -351,7 +689,6 @@ def task_updateMD5Summary(worker, job):
 
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
-    md5SummaryFilepath = os.path.join(cruiseDir, md5SummaryFN)
     
     debugPrint("Building filelist")
     fileList = []
@@ -370,9 +707,17 @@ def task_updateMD5Summary(worker, job):
 
     worker.send_job_status(job, 2, 10)
 
+    # Hashes computed by the collection system transfer while copying the files
+    try:
+        transferHashes = payloadObj['files']['hashes']
+    except KeyError:
+        transferHashes = {}
+    transferHashes = dict((worker.cruiseID + '/' + filename, transferHash) for filename, transferHash in transferHashes.items())
+
     debugPrint("Building hashes")
-    newHashes = build_hashes(worker, job, fileList)    
+    newHashes = build_hashes(worker, job, fileList, transferHashes=transferHashes)    
     debugPrint('Hashes:', json.dumps(newHashes, indent=2))
+    job_results['hashStats'] = worker.hashStats
 
     worker.send_job_status(job, 8, 10)
         
@@ -380,84 +725,55 @@ def task_updateMD5Summary(worker, job):
         return json.dumps(job_results)
     else:
         job_results['parts'].append({"partName": "Calculate Hashes", "result": "Pass"})
-    
-    existingHashes = []
 
-    debugPrint("Processing existing MD5 summary file")
-    
-    try:
-        MD5SummaryFile = open(md5SummaryFilepath, 'r')
+    worker.send_job_status(job, 85, 100)
 
-        for line in MD5SummaryFile:
-            (md5Hash, filename) = line.split(' ', 1)
-            existingHashes.append({'hash': md5Hash, 'filename': filename.rstrip('\n')})
+    for algorithm in sorted(newHashes):
+        summaryName = algorithm.upper() + " Summary"
 
-    except IOError:
-        errPrint("Error Reading MD5 Summary file")
-        job_results['parts'].append({"partName": "Reading pre-existing MD5 Summary file", "result": "Fail"})
-        return json.dumps(job_results)
+        if worker.OVDM.getMD5SummaryJournal():
+            debugPrint("Appending to", summaryName, "journal")
+            journalRecords = append_MD5SummaryJournal(worker, os.path.join(cruiseDir, build_summaryFilenames(algorithm)[2]), newHashes[algorithm])
 
-    finally:
-        MD5SummaryFile.close()
-        #debugPrint('Existing Hashes:', json.dumps(existingHashes, indent=2))
-        job_results['parts'].append({"partName": "Reading pre-existing MD5 Summary file", "result": "Pass"})
+            if journalRecords is False:
+                job_results['parts'].append({"partName": "Writing " + summaryName + " journal", "result": "Fail"})
+                return json.dumps(job_results)
 
-    row_added = 0
-    row_updated = 0
+            job_results['parts'].append({"partName": "Writing " + summaryName + " journal", "result": "Pass"})
+            debugPrint(len(newHashes[algorithm]), "record(s) added to journal,", journalRecords, "record(s) pending")
 
-    for newHash in newHashes:
-        updated = False
-        for existingHash in existingHashes:
-            if newHash['filename'] == existingHash['filename']:
-                existingHash['hash'] = newHash['hash']
-                updated = True
-                row_updated += 1
-                break
-        
-        if not updated:
-            existingHashes.append({'hash': newHash['hash'], 'filename': newHash['filename']})
-            row_added += 1
-        
-    if row_added > 0:
-        debugPrint(row_added, "row(s) added")
-    if row_updated > 0:
-        debugPrint(row_updated, "row(s) updated")
+            if journalRecords < worker.OVDM.getMD5SummaryJournalMaxRecords():
+                worker.compactionPending = True
+                continue
 
-    worker.send_job_status(job, 85, 100)
+            newHashes[algorithm] = []
 
-    #debugPrint("Sorting hashes")
-    sortedHashes = sorted(existingHashes, key=lambda hashes: hashes['filename'])
+        debugPrint("Building", summaryName, "file")
+        if compact_MD5Summary(worker, algorithm, newHashes[algorithm]):
+            job_results['parts'].append({"partName": "Writing " + summaryName + " file", "result": "Pass"})
+        else:
+            job_results['parts'].append({"partName": "Writing " + summaryName + " file", "result": "Fail"})
+            return json.dumps(job_results)
 
-    debugPrint("Building MD5 Summary file")
-    try:
-        #print "Open MD5 Summary file"
-        MD5SummaryFile = open(md5SummaryFilepath, 'w')
+    worker.send_job_status(job, 10, 10)
+    return json.dumps(job_results)
 
-        #print "Saving MD5 Summary file"
-        for filehash in sortedHashes:
-            MD5SummaryFile.write(filehash['hash'] + ' ' + filehash['filename'] + '\n')
 
-    except IOError:
-        errPrint("Error updating MD5 Summary file")
-        job_results['parts'].append({"partName": "Writing MD5 Summary file", "result": "Fail"})
-        MD5SummaryFile.close()
-        return json.dumps(job_results)    
+def task_compactMD5Summary(worker, job):
 
-    finally:
-        MD5SummaryFile.close()
-        setOwnerGroupPermissions(worker, md5SummaryFilepath)
-        job_results['parts'].append({"partName": "Writing MD5 Summary file", "result": "Pass"})
-    
-    worker.send_job_status(job, 9, 10)
+    job_results = {'parts':[]}
 
-    debugPrint("Building MD5 Summary MD5 file")
-    if build_MD5Summary_MD5(worker):
-        job_results['parts'].append({"partName": "Writing MD5 Summary MD5 file", "result": "Pass"})
+    worker.send_job_status(job, 1, 10)
+
+    debugPrint("Compacting summary journals")
+    if compact_MD5SummaryJournals(worker):
+        job_results['parts'].append({"partName": "Compacting Summary journals", "result": "Pass"})
     else:
-        job_results['parts'].append({"partName": "Writing MD5 Summary MD5 file", "result": "Fail"})
+        job_results['parts'].append({"partName": "Compacting Summary journals", "result": "Fail"})
 
     worker.send_job_status(job, 10, 10)
     return json.dumps(job_results)
+
     
 def task_rebuildMD5Summary(worker, job):
 
@@ -470,7 +786,6 @@ def task_rebuildMD5Summary(worker, job):
     
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
-    md5SummaryFilepath = os.path.join(cruiseDir, md5SummaryFN)
     
     fileList = build_filelist(worker)
     debugPrint('Filelist:', json.dumps(fileList, indent=2))
@@ -480,8 +795,9 @@ def task_rebuildMD5Summary(worker, job):
     worker.send_job_status(job, 2, 10)
 
     debugPrint("Building hashes")
-    newHashes = build_hashes(worker, job, fileList)
+    newHashes = build_hashes(worker, job, fileList, useCache=False)
     #debugPrint("Hashes:", json.dumps(newHashes, indent=2))
+    job_results['hashStats'] = worker.hashStats
     
     worker.send_job_status(job, 8, 10)
     
@@ -491,39 +807,33 @@ def task_rebuildMD5Summary(worker, job):
     else:
         job_results['parts'].append({"partName": "Calculate Hashes", "result": "Pass"})
 
-    worker.send_job_status(job, 85, 100)
-
-    debugPrint("Sorting Hashes")   
-    sortedHashes = sorted(newHashes, key=lambda hashes: hashes['filename'])
-    
     worker.send_job_status(job, 9, 10)
 
-    debugPrint("Building MD5 Summary file")
-    try:
-        #debugPrint("Saving new MD5 Summary file")
-        MD5SummaryFile = open(md5SummaryFilepath, 'w')
+    for algorithm in sorted(newHashes):
+        summaryName = algorithm.upper() + " Summary"
+        (summaryFN, summaryChecksumFN, summaryJournalFN) = build_summaryFilenames(algorithm)
 
-        for filehash in sortedHashes:
-            MD5SummaryFile.write(filehash['hash'] + ' ' + filehash['filename'] + '\n')
+        debugPrint("Building", summaryName, "file")
+        hashIndex = dict((newHash['filename'], newHash['hash']) for newHash in newHashes[algorithm])
 
-    except IOError:
-        errPrint("Error saving MD5 Summary file")
-        job_results['parts'].append({"partName": "Writing MD5 Summary file", "result": "Fail"})
-        MD5SummaryFile.close()
-        return json.dumps(job_results)    
+        md5SummaryMD5Hash = write_MD5Summary(worker, os.path.join(cruiseDir, summaryFN), hashIndex, algorithm)
+        if md5SummaryMD5Hash:
+            job_results['parts'].append({"partName": "Writing " + summaryName + " file", "result": "Pass"})
+        else:
+            job_results['parts'].append({"partName": "Writing " + summaryName + " file", "result": "Fail"})
+            return json.dumps(job_results)
 
-    finally:
-        MD5SummaryFile.close()
-        setOwnerGroupPermissions(worker, md5SummaryFilepath)
-        job_results['parts'].append({"partName": "Writing MD5 Summary file", "result": "Pass"})
-    
-    worker.send_job_status(job, 95, 100)
+        # The rebuilt summary supersedes anything still in the journal
+        if os.path.isfile(os.path.join(cruiseDir, summaryJournalFN)):
+            os.remove(os.path.join(cruiseDir, summaryJournalFN))
 
-    debugPrint("Building MD5 Summary MD5 file")
-    if build_MD5Summary_MD5(worker):
-        job_results['parts'].append({"partName": "Writing MD5 Summary MD5 file", "result": "Pass"})
-    else:
-        job_results['parts'].append({"partName": "Writing MD5 Summary MD5 file", "result": "Fail"})
+        debugPrint("Building", summaryName, algorithm.upper(), "file")
+        if build_MD5Summary_MD5(worker, algorithm, md5SummaryMD5Hash):
+            job_results['parts'].append({"partName": "Writing " + summaryName + " " + algorithm.upper() + " file", "result": "Pass"})
+        else:
+            job_results['parts'].append({"partName": "Writing " + summaryName + " " + algorithm.upper() + " file", "result": "Fail"})
+
+    worker.compactionPending = False
 
     worker.send_job_status(job, 10, 10)
     return json.dumps(job_results)
@@ -566,6 +876,8 @@ def main(argv):
     new_worker.register_task("updateMD5Summary", task_updateMD5Summary)
     debugPrint('   Task:', 'rebuildMD5Summary')
     new_worker.register_task("rebuildMD5Summary", task_rebuildMD5Summary)
+    debugPrint('   Task:', 'compactMD5Summary')
+    new_worker.register_task("compactMD5Summary", task_compactMD5Summary)
 
     debugPrint('Waiting for jobs...')
     new_worker.work()
@@ -120,6 +120,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
     
 
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
         #print payloadObj
         self.collectionSystemTransfer = self.OVDM.getCollectionSystemTransfer(payloadObj['collectionSystemTransferID'])
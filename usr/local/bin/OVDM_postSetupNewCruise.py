@@ -144,6 +144,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         return False
 
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         self.get_task(current_job)
         payloadObj = json.loads(current_job.data)
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
@@ -196,6 +197,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
 
         if len(resultsObj['parts']) > 0:
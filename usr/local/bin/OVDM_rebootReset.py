@@ -48,24 +48,25 @@ def main(argv):
     
     time.sleep(5)
         
-    tasks = openVDM.getTasks()
+    (tasks, collectionSystemTransfers, cruiseDataTransfers, requiredCruiseDataTransfers) = openVDM.callConcurrent([(openVDM.getTasks, ()), (openVDM.getCollectionSystemTransfers, ()), (openVDM.getCruiseDataTransfers, ()), (openVDM.getRequiredCruiseDataTransfers, ())])
+
+    calls = []
     for task in tasks:
-        openVDM.setIdle_task(task['taskID'])
+        calls.append((openVDM.setIdle_task, (task['taskID'],)))
     
-    collectionSystemTransfers = openVDM.getCollectionSystemTransfers()
     for collectionSystemTransfer in collectionSystemTransfers:
         if not collectionSystemTransfer['status'] == '3':
-            openVDM.setIdle_collectionSystemTransfer(collectionSystemTransfer['collectionSystemTransferID'])
+            calls.append((openVDM.setIdle_collectionSystemTransfer, (collectionSystemTransfer['collectionSystemTransferID'],)))
             
-    cruiseDataTransfers = openVDM.getCruiseDataTransfers()
     for cruiseDataTransfer in cruiseDataTransfers:
         if not cruiseDataTransfer['status'] == '3':
-            openVDM.setIdle_cruiseDataTransfer(cruiseDataTransfer['cruiseDataTransferID'])
+            calls.append((openVDM.setIdle_cruiseDataTransfer, (cruiseDataTransfer['cruiseDataTransferID'],)))
             
-    requiredCruiseDataTransfers = openVDM.getRequiredCruiseDataTransfers()
     for requiredCruiseDataTransfer in requiredCruiseDataTransfers:
         if not requiredCruiseDataTransfer['status'] == '3':
-            openVDM.setIdle_cruiseDataTransfer(requiredCruiseDataTransfer['cruiseDataTransferID'])
+            calls.append((openVDM.setIdle_cruiseDataTransfer, (requiredCruiseDataTransfer['cruiseDataTransferID'],)))
+
+    openVDM.callConcurrent(calls)
 
     openVDM.clearGearmanJobsFromDB()
 
@@ -41,17 +41,21 @@ import json
 import time
 import calendar
 import datetime
-import fnmatch
 import subprocess
 import signal
 import pwd
 import grp
+import sqlite3
 import openvdm
 from random import randint
+from openvdm_hash import available_hashAlgorithms, copy_file
+from openvdm_scan import compile_filters, match_filters, scan_dir
 
 DEBUG = False
 new_worker = None
 
+transferIndexPrefix = '.TransferIndex_'
+
 
 def debugPrint(*args, **kwargs):
     global DEBUG
@@ -63,9 +67,55 @@ def errPrint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
+def open_transferIndex(worker):
+
+    # The transfer index lives alongside the transfer logs in the cruise's OpenVDM
+    # directory, one per collection system transfer.  It records the size and mtime
+    # of every included file when it was last seen and when it was last transferred.
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    cruiseDir = os.path.join(baseDir, worker.cruiseID)
+    transferIndexDir = os.path.join(cruiseDir, os.path.dirname(worker.OVDM.getRequiredExtraDirectoryByName('Transfer Logs')['destDir']))
+    transferIndexFilepath = os.path.join(transferIndexDir, transferIndexPrefix + worker.collectionSystemTransfer['collectionSystemTransferID'] + '.db')
+
+    try:
+        transferIndex = sqlite3.connect(transferIndexFilepath)
+        transferIndex.text_factory = str
+        transferIndex.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, transferredSize INTEGER, transferredMtime REAL)')
+        transferIndex.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to open transfer index", transferIndexFilepath + ":", e)
+        return None
+
+    return transferIndex
+
+
+def update_transferIndex(worker, filenames):
+
+    # Record the files as transferred using the size and mtime seen by the scan
+    # that included them.  If a file changed during the transfer it no longer
+    # matches and is sent again by the next run.
+    transferIndex = open_transferIndex(worker)
+    if not transferIndex:
+        return False
+
+    try:
+        transferIndex.executemany('UPDATE files SET transferredSize = size, transferredMtime = mtime WHERE path = ?', [(filename,) for filename in filenames])
+        transferIndex.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update transfer index:", e)
+        return False
+
+    finally:
+        transferIndex.close()
+
+    return True
+
+
 def build_filelist(worker, sourceDir):
 
-    returnFiles = {'include':[], 'exclude':[], 'new':[], 'updated':[], 'filesize':[]}
+    returnFiles = {'include':[], 'exclude':[], 'new':[], 'updated':[]}
 
     staleness = int(worker.collectionSystemTransfer['staleness']) * 60 #5 Mintues
     threshold_time = time.time() - staleness
@@ -77,61 +127,116 @@ def build_filelist(worker, sourceDir):
     debugPrint("Threshold:", threshold_time)
     
     filters = build_filters(worker)
-    
-    for root, dirnames, filenames in os.walk(sourceDir):
-        for filename in filenames:
-            exclude = False
-            ignore = False
-            include = False
-            for filt in filters['ignoreFilter'].split(','):
-                #print filt
-                if fnmatch.fnmatch(os.path.join(root, filename), filt):
-                    debugPrint(filename, "ignored")
-                    ignore = True
-                    break
-            if not ignore:
-                for filt in filters['includeFilter'].split(','): 
-                    if fnmatch.fnmatch(filename, filt):
-                        for filt in filters['excludeFilter'].split(','): 
-                            if fnmatch.fnmatch(filename, filt):
-                                debugPrint(filename, "excluded")
-                                returnFiles['exclude'].append(os.path.join(root, filename))
-                                exclude = True
-                                break
-                        if not exclude:
-                            if os.path.islink(os.path.join(root, filename)):
-                                continue
-                            #debugPrint('Filename:', os.path.join(root, filename))
-                            file_mod_time = os.stat(os.path.join(root, filename)).st_mtime
-                            #debugPrint("file_mod_time:",file_mod_time)
-                            if file_mod_time > cruiseStart_time and file_mod_time < cruiseEnd_time:
-                                debugPrint(filename, "included")
-                                returnFiles['include'].append(os.path.join(root, filename))
-                                returnFiles['filesize'].append(os.stat(os.path.join(root, filename)).st_size)
-                            else:
-                                debugPrint(filename, "skipped for time reasons")
-
-                            include = True
-
-                if not include and not exclude:
-                    debugPrint(filename, "excluded")
-                    returnFiles['exclude'].append(os.path.join(root, filename))
+    ignoreFilters = compile_filters(filters['ignoreFilter'])
+    includeFilters = compile_filters(filters['includeFilter'])
+    excludeFilters = compile_filters(filters['excludeFilter'])
+
+    transferIndex = open_transferIndex(worker)
+    useSourceIndex = transferIndex and worker.OVDM.getCollectionSystemTransferSourceIndex()
+
+    # Size and mtime of every included file, keyed by path relative to sourceDir
+    snapshot = {}
+
+    for entry in scan_dir(sourceDir):
+        if match_filters(ignoreFilters, entry.path):
+            debugPrint(entry.name, "ignored")
+        elif not match_filters(includeFilters, entry.name):
+            debugPrint(entry.name, "excluded")
+            returnFiles['exclude'].append(entry.relPath)
+        elif match_filters(excludeFilters, entry.name):
+            debugPrint(entry.name, "excluded")
+            returnFiles['exclude'].append(entry.relPath)
+        elif entry.isLink:
+            continue
+        elif entry.mtime > cruiseStart_time and entry.mtime < cruiseEnd_time:
+            debugPrint(entry.name, "included")
+            returnFiles['include'].append(entry.relPath)
+            snapshot[entry.relPath] = (entry.size, entry.mtime)
+        else:
+            debugPrint(entry.name, "skipped for time reasons")
+
+    if not transferIndex:
+        if not worker.collectionSystemTransfer['staleness'] == '0':
+            # Without the transfer index there is no previous run to compare
+            # against, wait and look for files that changed in the meantime.
+            debugPrint("Checking for changing files")
+            time.sleep(5)
+
+            stableFiles = []
+            for filename in returnFiles['include']:
+                try:
+                    fileStat = os.stat(os.path.join(sourceDir, filename))
+                except OSError:
+                    debugPrint(filename, "removed because it is no longer readable")
+                    continue
+
+                if (fileStat.st_size, fileStat.st_mtime) == snapshot[filename]:
+                    stableFiles.append(filename)
+                else:
+                    debugPrint(filename, "removed because it is still changing")
+
+            returnFiles['include'] = stableFiles
+
+        return returnFiles
+
+    # (size, mtime) of each file when last seen and when last transferred
+    previousSeen = {}
+    previousTransferred = {}
+    for row in transferIndex.execute('SELECT path, size, mtime, transferredSize, transferredMtime FROM files'):
+        previousSeen[row[0]] = (row[1], row[2])
+        previousTransferred[row[0]] = (row[3], row[4])
 
     if not worker.collectionSystemTransfer['staleness'] == '0':
-        debugPrint("Checking for changing filesizes")
-        #debugPrint("Pausing for 5 seconds")
-        time.sleep(5)
-        for idx, val in enumerate(returnFiles['include']):
-            #debugPrint('idx:',idx,'val:',val,'filesize:',returnFiles['filesize'][idx])
-            if not os.stat(val).st_size == returnFiles['filesize'][idx]:
-                debugPrint(val, "removed because it's size is changing")
-                del returnFiles['include'][idx]
-                del returnFiles['filesize'][idx]
-
-    del returnFiles['filesize']
+        # A file is still changing if it was modified within the staleness window
+        # and its size or mtime differs from the previous run.  Files that are
+        # still changing are picked up by a later run.
+        debugPrint("Checking for changing files")
+
+        stableFiles = []
+        for filename in returnFiles['include']:
+            if snapshot[filename][1] < threshold_time or previousSeen.get(filename) == snapshot[filename]:
+                stableFiles.append(filename)
+            else:
+                debugPrint(filename, "removed because it is still changing")
 
-    returnFiles['include'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['include']]
-    returnFiles['exclude'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['exclude']]
+        returnFiles['include'] = stableFiles
+
+    if useSourceIndex:
+        # Only hand new or changed files to the transfer.  A file unchanged since it
+        # was last transferred is still handed over if its copy in the cruise
+        # directory is missing or no longer matches, so the transfer repairs it.
+        destDir = os.path.join(worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir'], worker.cruiseID, build_destDir(worker).rstrip('/'))
+
+        changedFiles = []
+        for filename in returnFiles['include']:
+            if previousTransferred.get(filename) == snapshot[filename]:
+                try:
+                    destStat = os.stat(os.path.join(destDir, filename))
+                except OSError:
+                    debugPrint(filename, "missing from the destination")
+                else:
+                    if destStat.st_size == snapshot[filename][0] and int(destStat.st_mtime) == int(snapshot[filename][1]):
+                        continue
+
+                    debugPrint(filename, "differs from the destination")
+
+            changedFiles.append(filename)
+
+        debugPrint(len(returnFiles['include']) - len(changedFiles), "file(s) unchanged since the last transfer")
+        returnFiles['include'] = changedFiles
+
+    try:
+        # Forget files that were removed from the source or are no longer included
+        transferIndex.executemany('DELETE FROM files WHERE path = ?', [(filename,) for filename in previousSeen if filename not in snapshot])
+        transferIndex.executemany('INSERT OR IGNORE INTO files (path) VALUES (?)', [(filename,) for filename in snapshot])
+        transferIndex.executemany('UPDATE files SET size = ?, mtime = ? WHERE path = ?', [(size, mtime, filename) for filename, (size, mtime) in snapshot.items()])
+        transferIndex.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update transfer index:", e)
+
+    finally:
+        transferIndex.close()
 
     return returnFiles
 
@@ -151,6 +256,9 @@ def build_rsyncFilelist(worker, sourceDir):
     debugPrint("End:",cruiseEnd_time)
 
     filters = build_filters(worker)
+    ignoreFilters = compile_filters(filters['ignoreFilter'])
+    includeFilters = compile_filters(filters['includeFilter'])
+    excludeFilters = compile_filters(filters['excludeFilter'])
 
     # Create temp directory
     tmpdir = tempfile.mkdtemp()
@@ -191,39 +299,19 @@ def build_rsyncFilelist(worker, sourceDir):
         #debugPrint('line:', line.rstrip('\n'))
         fileOrDir, size, mdate, mtime, filename = line.split(None, 4)
         if fileOrDir.startswith('-'):
-            exclude = False
-            ignore = False
-            include = False
-            for filt in filters['ignoreFilter'].split(','):
-                #print filt
-                if fnmatch.fnmatch(filename, filt):
-                    #print "ignore"
-                    ignore = True
-                    break
-            if not ignore:
-                for filt in filters['includeFilter'].split(','): 
-                    if fnmatch.fnmatch(filename, filt):
-                        for filt in filters['excludeFilter'].split(','): 
-                            if fnmatch.fnmatch(filename, filt):
-                                #print "exclude"
-                                returnFiles['exclude'].append(filename)
-                                exclude = True
-                                break
-                        if not exclude:
-                            file_mod_time = datetime.datetime.strptime(mdate + ' ' + mtime, "%Y/%m/%d %H:%M:%S")
-                            file_mod_time_SECS = (file_mod_time - epoch).total_seconds()
-                            #debugPrint("file_mod_time_SECS:", str(file_mod_time_SECS))
-                            if file_mod_time_SECS > cruiseStart_time and file_mod_time_SECS < threshold_time and file_mod_time_SECS < cruiseEnd_time:
-                                #debugPrint("include")
-                                returnFiles['include'].append(filename)
-                            else:
-                                debugPrint(filename, "skipped for time reasons")
-
-                            include = True
-
-                if not include:
-                    #print "exclude"
-                    returnFiles['exclude'].append(filename)
+            if match_filters(ignoreFilters, filename):
+                continue
+            elif not match_filters(includeFilters, filename) or match_filters(excludeFilters, filename):
+                returnFiles['exclude'].append(filename)
+            else:
+                file_mod_time = datetime.datetime.strptime(mdate + ' ' + mtime, "%Y/%m/%d %H:%M:%S")
+                file_mod_time_SECS = (file_mod_time - epoch).total_seconds()
+                #debugPrint("file_mod_time_SECS:", str(file_mod_time_SECS))
+                if file_mod_time_SECS > cruiseStart_time and file_mod_time_SECS < threshold_time and file_mod_time_SECS < cruiseEnd_time:
+                    #debugPrint("include")
+                    returnFiles['include'].append(filename)
+                else:
+                    debugPrint(filename, "skipped for time reasons")
 
     returnFiles['include'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['include']]
     returnFiles['exclude'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['exclude']]
@@ -248,6 +336,9 @@ def build_sshFilelist(worker, sourceDir):
     debugPrint("End:",cruiseEnd_time)
 
     filters = build_filters(worker)
+    ignoreFilters = compile_filters(filters['ignoreFilter'])
+    includeFilters = compile_filters(filters['includeFilter'])
+    excludeFilters = compile_filters(filters['excludeFilter'])
     
     rsyncFileList = ''
 
@@ -271,39 +362,19 @@ def build_sshFilelist(worker, sourceDir):
         if fileOrDir.startswith('-'):
             filename = name
             #print name
-            exclude = False
-            ignore = False
-            include = False
-            for filt in filters['ignoreFilter'].split(','):
-                #print filt
-                if fnmatch.fnmatch(filename, filt):
-                    #print "ignore"
-                    ignore = True
-                    break
-            if not ignore:
-                for filt in filters['includeFilter'].split(','): 
-                    if fnmatch.fnmatch(filename, filt):
-                        for filt in filters['excludeFilter'].split(','): 
-                            if fnmatch.fnmatch(filename, filt):
-                                #print "exclude"
-                                returnFiles['exclude'].append(filename)
-                                exclude = True
-                                break
-                        if not exclude:
-                            file_mod_time = datetime.datetime.strptime(mdate + ' ' + mtime, "%Y/%m/%d %H:%M:%S")
-                            file_mod_time_SECS = (file_mod_time - epoch).total_seconds()
-                            #debugPrint("file_mod_time_SECS:", str(file_mod_time_SECS))
-                            if file_mod_time_SECS > cruiseStart_time and file_mod_time_SECS < threshold_time and file_mod_time_SECS < cruiseEnd_time:
-                                #debugPrint("include")
-                                returnFiles['include'].append(filename)
-                            #else:
-                                #debugPrint(filename, "skipped for time reasons")
-
-                            include = True
-
-                if not include:
-                    #debugPrint("exclude")
-                    returnFiles['exclude'].append(filename)        
+            if match_filters(ignoreFilters, filename):
+                continue
+            elif not match_filters(includeFilters, filename) or match_filters(excludeFilters, filename):
+                returnFiles['exclude'].append(filename)
+            else:
+                file_mod_time = datetime.datetime.strptime(mdate + ' ' + mtime, "%Y/%m/%d %H:%M:%S")
+                file_mod_time_SECS = (file_mod_time - epoch).total_seconds()
+                #debugPrint("file_mod_time_SECS:", str(file_mod_time_SECS))
+                if file_mod_time_SECS > cruiseStart_time and file_mod_time_SECS < threshold_time and file_mod_time_SECS < cruiseEnd_time:
+                    #debugPrint("include")
+                    returnFiles['include'].append(filename)
+                #else:
+                    #debugPrint(filename, "skipped for time reasons")
 
     returnFiles['include'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['include']]
     returnFiles['exclude'] = [filename.split(sourceDir + '/',1).pop() for filename in returnFiles['exclude']]
@@ -435,6 +506,73 @@ def writeLogFile(worker, logfileName, fileList):
     return True
     
 
+def transfer_copyAndHash(worker, job, sourceDir, destDir, files):
+
+    # Copy the files without rsync, hashing each file as it is copied so the
+    # updateMD5Summary task does not have to read freshly transferred files again.
+    # Like rsync -t, files whose size and modification time already match the
+    # destination are skipped.
+    debugPrint("Copying and hashing files")
+
+    algorithms = available_hashAlgorithms(worker.OVDM.getHashAlgorithms())
+    buf = bytearray(worker.OVDM.getMD5HashBufferSize())
+    bandwidthLimit = int(worker.collectionSystemTransfer['bandwidthLimit'])
+
+    fileIndex = 0
+    fileCount = len(files['include'])
+
+    files['hashes'] = {}
+    failedFiles = []
+    for filename in files['include']:
+        sourceFilePath = os.path.join(sourceDir, filename)
+        destFilePath = os.path.join(destDir, filename)
+
+        try:
+            sourceStat = os.stat(sourceFilePath)
+        except OSError:
+            errPrint("Unable to read", sourceFilePath)
+            failedFiles.append(filename)
+            continue
+
+        newFile = not os.path.isfile(destFilePath)
+        if not newFile:
+            destStat = os.stat(destFilePath)
+            if destStat.st_size == sourceStat.st_size and int(destStat.st_mtime) == int(sourceStat.st_mtime):
+                continue
+
+        try:
+            (hashes, bytesCopied) = copy_file(sourceFilePath, destFilePath, buf, algorithms, bandwidthLimit)
+        except (IOError, OSError) as e:
+            errPrint("Unable to copy", sourceFilePath + ":", e)
+            failedFiles.append(filename)
+            continue
+
+        destStat = os.stat(destFilePath)
+        files['new' if newFile else 'updated'].append(filename)
+        files['hashes'][os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename)] = {'size': destStat.st_size, 'mtime': destStat.st_mtime, 'hashes': hashes}
+
+        worker.send_job_status(job, int(20 + 70*float(fileIndex)/float(fileCount)), 100)
+        fileIndex += 1
+
+        if worker.stop:
+            debugPrint("Stopping")
+            break
+
+    if worker.stop:
+        update_transferIndex(worker, files['new'] + files['updated'])
+    else:
+        failedFilenames = set(failedFiles)
+        update_transferIndex(worker, [filename for filename in files['include'] if filename not in failedFilenames])
+
+    files['new'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['new']]
+    files['updated'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['updated']]
+
+    # Files that could not be read or copied, the job reports the transfer as failed
+    files['failed'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in failedFiles]
+
+    return files
+
+
 def transfer_localSourceDir(worker, job):
 
     debugPrint("Transfer from Local Directory")
@@ -451,6 +589,9 @@ def transfer_localSourceDir(worker, job):
     files = build_filelist(worker, sourceDir)
     debugPrint("Files:", json.dumps(files['include'], indent=2))
 
+    if worker.OVDM.getHashDuringTransfer():
+        return transfer_copyAndHash(worker, job, sourceDir, destDir, files)
+
     fileIndex = 0
     fileCount = len(files['include'])
     
@@ -505,6 +646,11 @@ def transfer_localSourceDir(worker, job):
         if worker.stop:
             debugPrint("Stopping")
             break
+
+    transferredFiles = files['new'] + files['updated']
+    if not worker.stop and popen.wait() == 0:
+        transferredFiles = files['include']
+    update_transferIndex(worker, transferredFiles)
     
     files['new'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['new']]
     files['updated'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['updated']]
@@ -561,6 +707,16 @@ def transfer_smbSourceDir(worker, job):
     files = build_filelist(worker, sourceDir)
     
     debugPrint("File List:", json.dumps(files['include'], indent=2))
+
+    if worker.OVDM.getHashDuringTransfer():
+        files = transfer_copyAndHash(worker, job, sourceDir, destDir, files)
+
+        # Cleanup
+        debugPrint('Unmounting SMB Share')
+        subprocess.call(['sudo', 'umount', mntPoint])
+        shutil.rmtree(tmpdir)
+
+        return files
     
     fileIndex = 0
     fileCount = len(files['include'])
@@ -614,6 +770,11 @@ def transfer_smbSourceDir(worker, job):
         if worker.stop:
             debugPrint("Stopping")
             break
+
+    transferredFiles = files['new'] + files['updated']
+    if not worker.stop and popen.wait() == 0:
+        transferredFiles = files['include']
+    update_transferIndex(worker, transferredFiles)
     
     files['new'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['new']]
     files['updated'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['updated']]
@@ -836,6 +997,16 @@ def transfer_nfsSourceDir(worker, job):
     
     debugPrint("Build file list")
     files = build_filelist(worker, sourceDir)
+
+    if worker.OVDM.getHashDuringTransfer():
+        files = transfer_copyAndHash(worker, job, sourceDir, destDir, files)
+
+        # Cleanup
+        debugPrint('Unmounting NFS Share')
+        subprocess.call(['sudo', 'umount', mntPoint])
+        shutil.rmtree(tmpdir)
+
+        return files
     
     fileIndex = 0
     fileCount = len(files['include'])
@@ -888,6 +1059,11 @@ def transfer_nfsSourceDir(worker, job):
         if worker.stop:
             debugPrint("Stopping")
             break
+
+    transferredFiles = files['new'] + files['updated']
+    if not worker.stop and popen.wait() == 0:
+        transferredFiles = files['include']
+    update_transferIndex(worker, transferredFiles)
     
     files['new'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['new']]
     files['updated'] = [os.path.join(worker.collectionSystemTransfer['destDir'].rstrip('/'),filename) for filename in files['updated']]
@@ -918,9 +1094,11 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
     
     
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
+        jobContext = self.OVDM.getJobContext('collectionSystemTransfer', payloadObj['collectionSystemTransfer']['collectionSystemTransferID'])
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
-        self.collectionSystemTransfer = self.OVDM.getCollectionSystemTransfer(payloadObj['collectionSystemTransfer']['collectionSystemTransferID'])
+        self.collectionSystemTransfer = jobContext['collectionSystemTransfer']
         if not self.collectionSystemTransfer:
             return super(OVDMGearmanWorker, self).on_job_complete(current_job, json.dumps({'parts':[{"partName": "Located Collection System Tranfer Data", "result": "Fail"}], 'files':{'new':[],'updated':[], 'exclude':[]}}))
 
@@ -928,7 +1106,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         
         self.cruiseID = self.OVDM.getCruiseID()
         self.transferStartDate = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
-        self.systemStatus = self.OVDM.getSystemStatus()
+        self.systemStatus = jobContext['systemStatus']
 
         if len(payloadObj) > 0:
             try:
@@ -983,6 +1161,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
         
         if resultsObj['files']['new'] or resultsObj['files']['updated']:
@@ -1114,7 +1293,13 @@ def task_runCollectionSystemTransfer(worker, job):
     if len(job_results['files']['exclude']) > 0:
         debugPrint(len(job_results['files']['exclude']), 'misnamed file(s) encounted')
 
-    job_results['parts'].append({"partName": "Transfer Files", "result": "Pass"})
+    # Files the copy engine could not copy fail the transfer once the files that
+    # were copied have been logged
+    transferFailed = len(job_results['files'].get('failed', [])) > 0
+    if transferFailed:
+        errPrint(len(job_results['files']['failed']), 'file(s) could not be transferred')
+    else:
+        job_results['parts'].append({"partName": "Transfer Files", "result": "Pass"})
 
     worker.send_job_status(job, 9, 10)
     
@@ -1165,6 +1350,9 @@ def task_runCollectionSystemTransfer(worker, job):
         job_results['parts'].append({"partName": "Write exclude logfile", "result": "Fail"})
         return job_results
 
+    if transferFailed:
+        job_results['parts'].append({"partName": "Transfer Files", "result": "Fail"})
+
     worker.send_job_status(job, 10, 10)
     
     time.sleep(5)
@@ -40,11 +40,11 @@ import gearman
 import shutil
 import json
 import time
-import fnmatch
 import subprocess
 import signal
 import openvdm
 from random import randint
+from openvdm_scan import compile_filters, match_filters, scan_dir, is_internalFile
 
 
 DEBUG = False
@@ -64,18 +64,18 @@ def errPrint(*args, **kwargs):
 def build_filelist(sourceDir, filters):
 
     returnFiles = {'include':[], 'exclude':[], 'new':[], 'updated':[]}
-    for root, dirnames, filenames in os.walk(sourceDir):
-        for filename in filenames:
-            if not fnmatch.fnmatch(filename, filters['includeFilter']) and not fnmatch.fnmatch(filename, filters['ignoreFilter']):
-                returnFiles['exclude'].append(os.path.join(root, filename))
-        for filename in fnmatch.filter(filenames, filters['includeFilter']):
-            if not fnmatch.fnmatch(filename, filters['excludeFilter']) and not fnmatch.fnmatch(filename, filters['ignoreFilter']):
-                returnFiles['include'].append(os.path.join(root, filename))
-            if fnmatch.fnmatch(filename, filters['excludeFilter']) and not fnmatch.fnmatch(filename, filters['ignoreFilter']):
-                returnFiles['exclude'].append(os.path.join(root, filename))
-
-    returnFiles['include'] = [filename.replace(sourceDir + '/', '', 1) for filename in returnFiles['include']]
-    returnFiles['exclude'] = [filename.replace(sourceDir + '/', '', 1) for filename in returnFiles['exclude']]
+
+    includeFilters = compile_filters(filters['includeFilter'])
+    excludeFilters = compile_filters(filters['excludeFilter'])
+    ignoreFilters = compile_filters(filters['ignoreFilter'])
+
+    for entry in scan_dir(sourceDir):
+        if is_internalFile(entry.name) or match_filters(ignoreFilters, entry.name):
+            continue
+        elif match_filters(includeFilters, entry.name) and not match_filters(excludeFilters, entry.name):
+            returnFiles['include'].append(entry.relPath)
+        else:
+            returnFiles['exclude'].append(entry.relPath)
     
     return returnFiles
 
@@ -535,13 +535,15 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         
         
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
+        jobContext = self.OVDM.getJobContext('cruiseDataTransfer', payloadObj['cruiseDataTransfer']['cruiseDataTransferID'])
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
-        self.cruiseDataTransfer = self.OVDM.getCruiseDataTransfer(payloadObj['cruiseDataTransfer']['cruiseDataTransferID'])
+        self.cruiseDataTransfer = jobContext['cruiseDataTransfer']
         self.cruiseDataTransfer.update(payloadObj['cruiseDataTransfer'])
         
         self.cruiseID = self.OVDM.getCruiseID()
-        self.systemStatus = self.OVDM.getSystemStatus()
+        self.systemStatus = jobContext['systemStatus']
         if len(payloadObj) > 0:
             try:
                 payloadObj['cruiseID']
@@ -575,6 +577,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
         
         # If the last part of the results failed
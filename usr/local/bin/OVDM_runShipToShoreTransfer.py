@@ -41,17 +41,53 @@ import shutil
 import json
 import time
 import calendar
-import fnmatch
 import subprocess
 import signal
 import pwd
 import grp
+import sqlite3
+import socket
+import errno
+import threading
 import openvdm
+from datetime import datetime
 from random import randint
+from openvdm_bundle import write_bundle
+from openvdm_scan import compile_filterGroups, match_filterGroups, scan_dir, is_internalFile
 
 DEBUG = False
 new_worker = None
 
+transferQueuePrefix = '.TransferQueue_'
+
+# Bundles are sent to this directory below the ship-to-shore destination directory
+# and restored on shore by OVDM_unpackBundles.py
+bundleDirName = 'OpenVDM_Bundles'
+
+# Partially sent files are kept on shore in this directory (relative to each
+# destination directory) so an interrupted transfer resumes where it left off
+partialDirName = '.OpenVDM_Partial'
+
+# rsync gives up after this many seconds without any data moving so a dropped
+# link ends the run instead of hanging it
+rsyncTimeout = 300
+
+# Seconds between saving the files confirmed by rsync to the transfer queue while
+# a batch is being sent
+checkpointInterval = 30
+
+# Adaptive bandwidth limit controller.  The limit is multiplied by bwLimitBackoff
+# when the RTT measured during a batch exceeds bwLimitCongestionRTT times the
+# baseline (idle link) RTT or when the link delivers less than bwLimitShortfall of
+# the limit.  Otherwise it is increased by bwLimitIncrease of the maximum limit.
+bwLimitBackoff = 0.7
+bwLimitCongestionRTT = 1.5
+bwLimitShortfall = 0.5
+bwLimitIncrease = 0.1
+
+# Batches shorter than this many seconds are too short to judge the throughput
+bwLimitMinSampleTime = 10
+
 
 def debugPrint(*args, **kwargs):
     if DEBUG:
@@ -65,14 +101,16 @@ def errPrint(*args, **kwargs):
 def build_filelist(worker):
 
     debugPrint("Building filters")
-    rawFilters = {'includeFilter':[]}
     shipToShoreTransfers = []
     shipToShoreTransfers += worker.OVDM.getShipToShoreTransfers()
     shipToShoreTransfers += worker.OVDM.getRequiredShipToShoreTransfers()
 
     #debugPrint('shipToShoreTransfers:',json.dumps(shipToShoreTransfers, indent=2))
-    
+
+    # One group of include filters per priority, highest priority first
+    filterGroups = []
     for x in range(1, 6):
+        rawFilters = {'includeFilter':[]}
         for shipToShoreTransfer in shipToShoreTransfers:
             if shipToShoreTransfer['priority'] == str(x):
                 if shipToShoreTransfer['enable'] == '1':
@@ -91,22 +129,33 @@ def build_filelist(worker):
                         shipToShoreFilters = ['*/' + worker.cruiseID + '/' + shipToShoreFilter for shipToShoreFilter in shipToShoreFilters]
                         rawFilters['includeFilter'] = rawFilters['includeFilter'] + shipToShoreFilters
 
-    #debugPrint("Raw Filters:", json.dumps(rawFilters, indent=2))
-    
-    procfilters = build_filters(worker, rawFilters)
-    #debugPrint("Processed Filters:", json.dumps(rawFilters, indent=2))
+        procfilters = build_filters(worker, rawFilters)
+        filterGroups.append(('priority' + str(x), procfilters['includeFilter']))
+
+    #debugPrint("Filters:", json.dumps(filterGroups, indent=2))
+
+    includeFilters = compile_filterGroups(filterGroups)
 
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
 
-    returnFiles = {'include':[], 'new':[], 'updated':[]}
-    for includeFilter in procfilters['includeFilter']:
-        for root, dirnames, filenames in os.walk(cruiseDir):
-            for filename in filenames:
-                if fnmatch.fnmatch(os.path.join(root, filename), includeFilter):
-                    returnFiles['include'].append(os.path.join(root, filename))
+    # A single walk of the cruise directory, each file is tested against every
+    # filter at once and assigned the highest priority that matches it
+    priorityFiles = dict((x, []) for x in range(1, 6))
+    for entry in scan_dir(cruiseDir):
+        if is_internalFile(entry.name):
+            continue
+
+        priority = match_filterGroups(includeFilters, entry.path)
+        if priority:
+            priorityFiles[int(priority[len('priority'):])].append(entry)
+
+    returnFiles = {'include':[], 'priority':[], 'filestat':[], 'new':[], 'updated':[]}
+    for x in range(1, 6):
+        returnFiles['include'] += [entry.path.replace(baseDir + '/', '', 1) for entry in priorityFiles[x]]
+        returnFiles['priority'] += [x] * len(priorityFiles[x])
+        returnFiles['filestat'] += [(entry.size, entry.mtime) for entry in priorityFiles[x]]
 
-    returnFiles['include'] = [filename.replace(baseDir + '/', '', 1) for filename in returnFiles['include']]
     return returnFiles
 
 
@@ -211,81 +260,467 @@ def writeLogFile(worker, logfileName, fileList):
     return True
             
     
-def transfer_sshDestDir(worker, job):
-
-    debugPrint("Transfer from SSH Server")
-
-    filters = {'includeFilter': '*','excludeFilter': '','ignoreFilter': ''}
+def open_transferQueue(worker):
 
+    # The transfer queue lives alongside the transfer logs in the cruise's OpenVDM
+    # directory.  It records the size and mtime of every file when it was last
+    # sent to shore and when it was first queued.
     baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
     cruiseDir = os.path.join(baseDir, worker.cruiseID)
-    
-    sourceDir = cruiseDir
-    destDir = worker.cruiseDataTransfer['destDir'].rstrip('/')
-    
-    #debugPrint("Source Dir:", sourceDir)
-    #debugPrint("Destination Dir:", destDir)
+    transferQueueDir = os.path.join(cruiseDir, os.path.dirname(worker.OVDM.getRequiredExtraDirectoryByName('Transfer Logs')['destDir']))
+    transferQueueFilepath = os.path.join(transferQueueDir, transferQueuePrefix + worker.cruiseDataTransfer['cruiseDataTransferID'] + '.db')
 
-    debugPrint("Build file list")
-    files = build_filelist(worker)
-        
-    # Create temp directory
-    tmpdir = tempfile.mkdtemp()
+    try:
+        transferQueue = sqlite3.connect(transferQueueFilepath)
+        transferQueue.text_factory = str
+        transferQueue.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sentSize INTEGER, sentMtime REAL, queued REAL, interrupted INTEGER)')
+
+        try:
+            transferQueue.execute('ALTER TABLE files ADD COLUMN interrupted INTEGER')
+        except sqlite3.OperationalError:
+            pass # already exists
+
+    except sqlite3.Error as e:
+        errPrint("Unable to open transfer queue", transferQueueFilepath + ":", e)
+        return None
+
+    return transferQueue
+
+
+def build_transferQueue(worker, files):
+
+    # Returns the files that still need to be sent to shore as a list per
+    # priority.  Within a priority, files carried over from previous runs are
+    # sent first.
+    pendingFiles = dict((x, []) for x in range(1, 6))
+
+    transferQueue = open_transferQueue(worker)
+    if not transferQueue:
+        for (filename, priority, filestat) in zip(files['include'], files['priority'], files['filestat']):
+            pendingFiles[priority].append((filename, filestat[0]))
+        return pendingFiles
+
+    sentFiles = {}
+    queuedFiles = {}
+    for row in transferQueue.execute('SELECT path, sentSize, sentMtime, queued FROM files'):
+        sentFiles[row[0]] = (row[1], row[2])
+        queuedFiles[row[0]] = row[3]
+
+    now = time.time()
+    queueEntries = []
+    for (filename, priority, filestat) in zip(files['include'], files['priority'], files['filestat']):
+        if sentFiles.get(filename) == filestat:
+            continue
+
+        queued = queuedFiles.get(filename) or now
+        pendingFiles[priority].append((queued, filename, filestat[0]))
+        queueEntries.append((filestat[0], filestat[1], queued, filename))
+
+    try:
+        transferQueue.executemany('INSERT OR IGNORE INTO files (path) VALUES (?)', [(queueEntry[3],) for queueEntry in queueEntries])
+        transferQueue.executemany('UPDATE files SET size = ?, mtime = ?, queued = ? WHERE path = ?', queueEntries)
+        transferQueue.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update transfer queue:", e)
+
+    finally:
+        transferQueue.close()
+
+    for x in range(1, 6):
+        pendingFiles[x] = [(filename, size) for (queued, filename, size) in sorted(pendingFiles[x])]
+
+    return pendingFiles
+
+
+def update_transferQueue(worker, filenames):
+
+    # Record the files as sent using the size and mtime they were queued with
+    transferQueue = open_transferQueue(worker)
+    if not transferQueue:
+        return False
+
+    try:
+        transferQueue.executemany('UPDATE files SET sentSize = size, sentMtime = mtime, queued = NULL, interrupted = NULL WHERE path = ?', [(filename,) for filename in filenames])
+        transferQueue.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update transfer queue:", e)
+        return False
+
+    finally:
+        transferQueue.close()
+
+    return True
+
+
+def interrupt_transferQueue(worker, filenames):
+
+    # Record the files of an interrupted transfer that rsync had not confirmed.  One
+    # of them was being sent and has a partial copy on shore.
+    transferQueue = open_transferQueue(worker)
+    if not transferQueue:
+        return False
+
+    try:
+        transferQueue.executemany('UPDATE files SET interrupted = 1 WHERE path = ?', [(filename,) for filename in filenames])
+        transferQueue.commit()
+
+    except sqlite3.Error as e:
+        errPrint("Unable to update transfer queue:", e)
+        return False
+
+    finally:
+        transferQueue.close()
+
+    return True
+
+
+def get_interruptedFiles(worker):
+
+    # Returns the files left unconfirmed by an earlier interrupted transfer
+    transferQueue = open_transferQueue(worker)
+    if not transferQueue:
+        return set()
+
+    try:
+        return set([row[0] for row in transferQueue.execute('SELECT path FROM files WHERE interrupted = 1')])
+
+    except sqlite3.Error as e:
+        errPrint("Unable to read transfer queue:", e)
+        return set()
+
+    finally:
+        transferQueue.close()
+
+
+def build_batch(pendingFiles, budget):
+
+    # Takes (filename, size) pairs from the front of the queue until the byte
+    # budget is used, 0 is unlimited.  The first file is always taken so a file
+    # larger than the budget can not block the queue.
+    batchBytes = 0
+    for idx, (filename, size) in enumerate(pendingFiles):
+        if budget > 0 and idx > 0 and batchBytes + size > budget:
+            return (pendingFiles[:idx], pendingFiles[idx:])
+        batchBytes += size
+
+    return (pendingFiles, [])
+
+
+def measure_rtt(worker, timeout=10):
+
+    # Time a TCP handshake with the shore-side server, roughly one RTT.  A refused
+    # connection takes the same round trip so the probe port does not have to be
+    # open.
+    startTime = time.time()
+    try:
+        sock = socket.create_connection((worker.cruiseDataTransfer['sshServer'], worker.OVDM.getShipToShoreRTTProbePort()), timeout)
+        sock.close()
+    except socket.error as e:
+        if e.errno != errno.ECONNREFUSED:
+            return None
+
+    return time.time() - startTime
+
+
+def adapt_bwLimit(worker, bwLimit, batchResults, baseRTT):
+
+    # Returns the bandwidth limit (KB/s) to use for the next batch
+    (minBWLimit, maxBWLimit) = worker.OVDM.getShipToShoreBWLimitBounds()
+
+    throughput = None
+    if batchResults['elapsed'] >= bwLimitMinSampleTime:
+        throughput = batchResults['bytesSent'] / 1024.0 / batchResults['elapsed']
+
+    if batchResults['rtt'] and baseRTT and batchResults['rtt'] > baseRTT * bwLimitCongestionRTT:
+        # Queues are building along the link
+        debugPrint("RTT", round(batchResults['rtt'], 3), "exceeds baseline", round(baseRTT, 3), "backing off")
+        bwLimit = bwLimit * bwLimitBackoff
+    elif throughput is not None and throughput < bwLimit * bwLimitShortfall:
+        # Something else is using the link
+        debugPrint("Throughput", int(throughput), "KB/s well below limit, backing off")
+        bwLimit = max(throughput, bwLimit * bwLimitBackoff)
+    else:
+        bwLimit = bwLimit + maxBWLimit * bwLimitIncrease
+
+    return int(min(max(bwLimit, minBWLimit), maxBWLimit))
+
+
+def transfer_sshBatch(worker, job, tmpdir, batchFiles, bwLimit, fileIndex, fileCount, measureRTT=False, baseDir=None, destDir=None, checkpoint=True):
+
+    # baseDir and destDir default to the shipboard data warehouse and the
+    # ship-to-shore destination directory.  With checkpoint the files confirmed by
+    # rsync are saved to the transfer queue every checkpointInterval seconds so
+    # they are not sent again if the worker dies part way through the batch.
+    if baseDir is None:
+        baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    if destDir is None:
+        destDir = worker.cruiseDataTransfer['destDir'].rstrip('/')
+
+    returnFiles = {'new':[], 'updated':[], 'fileBytes':{}, 'complete': False, 'bytesSent': 0, 'elapsed': 0, 'rtt': None}
 
     sshFileListPath = os.path.join(tmpdir, 'sshFileList.txt')
-    
-    fileIndex = 0
-    fileCount = len(files['include'])
 
     try:
         sshFileListFile = open(sshFileListPath, 'w')
-        sshFileListFile.write('\n'.join(files['include']))
+        sshFileListFile.write('\n'.join(batchFiles))
 
     except IOError:
         errPrint("Error Saving temporary ssh filelist file")
         sshFileListFile.close()
-            
-        # Cleanup
-        shutil.rmtree(tmpdir)
-            
-        return False
+        return returnFiles
 
     finally:
         sshFileListFile.close()
 
-    bandwidthLimit = '--bwlimit=20000000' # 20GB/s a.k.a. stupid big
+    bandwidthLimit = '--bwlimit=' + str(bwLimit)
 
-    if worker.bandwidthLimit != '0' and worker.bandwidthLimitStatus:
-        bandwidthLimit = '--bwlimit=' + worker.bandwidthLimit
+    # %b makes rsync report each file once it has been sent along with the bytes
+    # it took, rather than when it starts
+    rsyncOptions = ['-tr', '--out-format=%i %b %n', '--stats', '--partial-dir=' + partialDirName, '--timeout=' + str(rsyncTimeout), bandwidthLimit]
 
     if worker.cruiseDataTransfer['sshUseKey'] == '1':
-        command = ['rsync', '-tri', bandwidthLimit, '--files-from=' + sshFileListPath, '-e', 'ssh', baseDir, worker.cruiseDataTransfer['sshUser'] + '@' + worker.cruiseDataTransfer['sshServer'] + ':' + destDir]
+        command = ['rsync'] + rsyncOptions + ['--files-from=' + sshFileListPath, '-e', 'ssh', baseDir, worker.cruiseDataTransfer['sshUser'] + '@' + worker.cruiseDataTransfer['sshServer'] + ':' + destDir]
     else:
-        command = ['sshpass', '-p', worker.cruiseDataTransfer['sshPass'], 'rsync', '-tri', bandwidthLimit, '--files-from=' + sshFileListPath, '-e', 'ssh', baseDir, worker.cruiseDataTransfer['sshUser'] + '@' + worker.cruiseDataTransfer['sshServer'] + ':' + destDir]
+        command = ['sshpass', '-p', worker.cruiseDataTransfer['sshPass'], 'rsync'] + rsyncOptions + ['--files-from=' + sshFileListPath, '-e', 'ssh', baseDir, worker.cruiseDataTransfer['sshUser'] + '@' + worker.cruiseDataTransfer['sshServer'] + ':' + destDir]
     
     s = ' '
     debugPrint('Transfer Command:',s.join(command))
     
+    startTime = time.time()
     popen = subprocess.Popen(command, stdout=subprocess.PIPE)
+
+    # Sample the RTT while the batch is being sent
+    rttSamples = []
+    rttProbeInterval = worker.OVDM.getShipToShoreRTTProbeInterval()
+    def sample_rtt():
+        while popen.poll() is None and not worker.stop:
+            rtt = measure_rtt(worker)
+            if rtt is not None:
+                rttSamples.append(rtt)
+            time.sleep(rttProbeInterval)
+
+    if measureRTT:
+        rttThread = threading.Thread(target=sample_rtt)
+        rttThread.daemon = True
+        rttThread.start()
    
+    checkpointFiles = []
+    checkpointTime = startTime
+
     lines_iterator = iter(popen.stdout.readline, b"")
     for line in lines_iterator:
         #debugPrint('line', line.rstrip('\n'))
-        if line.startswith( '<f+++++++++' ):
-            filename = line.split(' ',1)[1].rstrip('\n')
-            files['new'].append(filename)
-            worker.send_job_status(job, int(20 + 70*float(fileIndex)/float(fileCount)), 100)
-            fileIndex += 1
-        elif line.startswith( '<f.' ):
-            filename = line.split(' ',1)[1].rstrip('\n')
-            files['updated'].append(filename)
+        if line.startswith('Total bytes sent:'):
+            returnFiles['bytesSent'] = int(line.split(':',1)[1].strip().replace(',', ''))
+        elif line.startswith( '<f' ):
+            (itemize, fileBytes, filename) = line.rstrip('\n').split(' ',2)
+            if itemize.startswith( '<f+++++++++' ):
+                returnFiles['new'].append(filename)
+            else:
+                returnFiles['updated'].append(filename)
+            returnFiles['fileBytes'][filename] = int(fileBytes)
+            checkpointFiles.append(filename)
             worker.send_job_status(job, int(20 + 70*float(fileIndex)/float(fileCount)), 100)
             fileIndex += 1
-            
+
+        if checkpoint and checkpointFiles and time.time() - checkpointTime > checkpointInterval:
+            update_transferQueue(worker, checkpointFiles)
+            checkpointFiles = []
+            checkpointTime = time.time()
+
         if worker.stop:
             debugPrint("Stopping")
+            popen.terminate()
             break
 
+    if popen.wait() == 0 and not worker.stop:
+        returnFiles['complete'] = True
+
+    if checkpoint and checkpointFiles:
+        update_transferQueue(worker, checkpointFiles)
+
+    returnFiles['elapsed'] = time.time() - startTime
+    if rttSamples:
+        returnFiles['rtt'] = sorted(rttSamples)[len(rttSamples) // 2]
+
+    return returnFiles
+
+
+def transfer_sshBundle(worker, job, tmpdir, bundleFiles, priority, bwLimit, fileIndex, fileCount, measureRTT=False):
+
+    # Packs the files into a single compressed bundle and sends it, along with its
+    # checksum file, to the bundle directory on shore.  Returns the batch results
+    # with the list of bundled files, None if the bundle could not be written.
+    baseDir = worker.shipboardDataWarehouseConfig['shipboardDataWarehouseBaseDir']
+    destDir = worker.cruiseDataTransfer['destDir'].rstrip('/')
+    bundleDir = os.path.join(tmpdir, bundleDirName)
+
+    bundleName = worker.cruiseID + '_P' + str(priority) + '_' + datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+
+    try:
+        if not os.path.isdir(bundleDir):
+            os.makedirs(bundleDir)
+
+        (bundleFilename, checksumFilename, bundledFiles) = write_bundle(baseDir, bundleFiles, bundleDir, bundleName, worker.OVDM.getShipToShoreBundleCompression())
+
+    except (IOError, OSError) as e:
+        errPrint("Unable to write bundle:", e)
+        return None
+
+    debugPrint("Bundled", len(bundledFiles), "file(s) into", bundleFilename, "-", os.path.getsize(os.path.join(bundleDir, bundleFilename)), "bytes")
+
+    batchResults = transfer_sshBatch(worker, job, tmpdir, [bundleFilename, checksumFilename], bwLimit, fileIndex, fileCount, measureRTT, bundleDir, destDir + '/' + bundleDirName, False)
+    batchResults['bundled'] = bundledFiles
+
+    os.remove(os.path.join(bundleDir, bundleFilename))
+    os.remove(os.path.join(bundleDir, checksumFilename))
+
+    return batchResults
+
+
+def transfer_sshDestDir(worker, job):
+
+    debugPrint("Transfer from SSH Server")
+
+    debugPrint("Build file list")
+    files = build_filelist(worker)
+
+    # Files are sent in priority order, one rsync batch per priority.  Files
+    # beyond a priority's per-run byte budget are carried over to the next run.
+    pendingFiles = build_transferQueue(worker, files)
+
+    del files['priority']
+    del files['filestat']
+    files['deferred'] = []
+
+    # A file cut off by an earlier interrupted run resumes from the partial copy
+    # left on shore.  transferBytes records the bytes sent for files not involved
+    # in an interrupted run (new), the bytes sent for files left unconfirmed by an
+    # interrupted run (resent) and the bytes of those files that did not have to
+    # be sent again (resumed).
+    interruptedFiles = get_interruptedFiles(worker)
+    files['transferBytes'] = {'new': 0, 'resent': 0, 'resumed': 0}
+
+    # Small files are packed into compressed bundles and sent as a single file
+    # instead of one rsync transfer each.
+    bundleFiles = worker.OVDM.getShipToShoreBundleFiles()
+    if bundleFiles:
+        bundleMaxFileSize = worker.OVDM.getShipToShoreBundleMaxFileSize()
+        files['bundled'] = []
+
+    # Create temp directory
+    tmpdir = tempfile.mkdtemp()
+
+    fileIndex = 0
+    fileCount = sum([len(pendingFiles[x]) for x in range(1, 6)])
+
+    bwLimit = 20000000 # 20GB/s a.k.a. stupid big
+
+    if worker.bandwidthLimit != '0' and worker.bandwidthLimitStatus:
+        bwLimit = int(worker.bandwidthLimit)
+
+    # With the adaptive bandwidth limit each priority batch is split into chunks
+    # of roughly adaptiveInterval seconds at the current limit and the limit is
+    # adjusted after every chunk from the throughput and RTT it achieved.
+    # The RTT is only probed when rttProbeInterval is set, otherwise the limit
+    # follows the throughput alone.
+    adaptiveBWLimit = worker.OVDM.getShipToShoreAdaptiveBWLimit()
+    measureRTT = adaptiveBWLimit and worker.OVDM.getShipToShoreRTTProbeInterval() > 0
+    baseRTT = None
+    if adaptiveBWLimit and fileCount > 0:
+        (minBWLimit, maxBWLimit) = worker.OVDM.getShipToShoreBWLimitBounds()
+        bwLimit = min(max(worker.adaptiveBWLimit or bwLimit, minBWLimit), maxBWLimit)
+        adaptiveInterval = worker.OVDM.getShipToShoreAdaptiveInterval()
+
+        if measureRTT:
+            baseRTT = measure_rtt(worker)
+            debugPrint("Baseline RTT:", baseRTT)
+        files['bandwidth'] = []
+
+    for x in range(1, 6):
+        if not pendingFiles[x]:
+            continue
+
+        (batchFiles, deferredFiles) = build_batch(pendingFiles[x], worker.OVDM.getShipToShorePriorityBudget(x))
+        files['deferred'] += [filename for (filename, size) in deferredFiles]
+        debugPrint("Priority", x, "-", len(batchFiles), "file(s) to send,", len(deferredFiles), "file(s) carried over")
+
+        while batchFiles:
+            if adaptiveBWLimit:
+                (chunkFiles, batchFiles) = build_batch(batchFiles, bwLimit * 1024 * adaptiveInterval)
+            else:
+                (chunkFiles, batchFiles) = (batchFiles, [])
+
+            batchResults = {'complete': True, 'bytesSent': 0, 'elapsed': 0, 'rtt': None}
+
+            smallFiles = []
+            if bundleFiles:
+                smallFiles = [filename for (filename, size) in chunkFiles if size <= bundleMaxFileSize]
+
+            if smallFiles:
+                bundleResults = transfer_sshBundle(worker, job, tmpdir, smallFiles, x, bwLimit, fileIndex, fileCount, measureRTT)
+                if bundleResults:
+                    fileIndex += len(bundleResults['bundled'])
+
+                    if bundleResults['complete']:
+                        files['bundled'] += bundleResults['bundled']
+                        update_transferQueue(worker, bundleResults['bundled'])
+
+                    bundled = set(bundleResults['bundled'])
+                    chunkFiles = [(filename, size) for (filename, size) in chunkFiles if filename not in bundled]
+
+                    batchResults.update({'complete': bundleResults['complete'], 'bytesSent': bundleResults['bytesSent'], 'elapsed': bundleResults['elapsed'], 'rtt': bundleResults['rtt']})
+
+            chunkSizes = dict(chunkFiles)
+            chunkFiles = [filename for (filename, size) in chunkFiles]
+
+            if chunkFiles and not worker.stop:
+                fileResults = transfer_sshBatch(worker, job, tmpdir, chunkFiles, bwLimit, fileIndex, fileCount, measureRTT)
+                fileIndex += len(chunkFiles)
+
+                files['new'] += fileResults['new']
+                files['updated'] += fileResults['updated']
+
+                if fileResults['complete']:
+                    update_transferQueue(worker, chunkFiles)
+                else:
+                    update_transferQueue(worker, fileResults['new'] + fileResults['updated'])
+
+                    sentFiles = set(fileResults['new'] + fileResults['updated'])
+                    interrupt_transferQueue(worker, [filename for filename in chunkFiles if filename not in sentFiles])
+
+                for (filename, fileBytes) in fileResults['fileBytes'].items():
+                    if filename in interruptedFiles:
+                        files['transferBytes']['resent'] += fileBytes
+                        files['transferBytes']['resumed'] += max(chunkSizes[filename] - fileBytes, 0)
+                    else:
+                        files['transferBytes']['new'] += fileBytes
+
+                batchResults['complete'] = batchResults['complete'] and fileResults['complete']
+                batchResults['bytesSent'] += fileResults['bytesSent']
+                batchResults['elapsed'] += fileResults['elapsed']
+                if (fileResults['rtt'] or 0) > (batchResults['rtt'] or 0):
+                    batchResults['rtt'] = fileResults['rtt']
+
+            if worker.stop:
+                break
+
+            if adaptiveBWLimit:
+                if batchResults['rtt'] and (baseRTT is None or batchResults['rtt'] < baseRTT):
+                    baseRTT = batchResults['rtt']
+
+                files['bandwidth'].append({'time': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), 'priority': x, 'bwLimit': bwLimit, 'bytesSent': batchResults['bytesSent'], 'elapsed': round(batchResults['elapsed'], 1), 'rtt': batchResults['rtt']})
+                bwLimit = adapt_bwLimit(worker, bwLimit, batchResults, baseRTT)
+                worker.adaptiveBWLimit = bwLimit
+                debugPrint("Bandwidth limit:", bwLimit, "KB/s")
+
+        if worker.stop:
+            break
+
+    debugPrint("Bytes sent:", files['transferBytes']['new'], "new,", files['transferBytes']['resent'], "resent,", files['transferBytes']['resumed'], "resumed from partial files")
+
 #    files['new'] = [os.path.join(baseDir,filename) for filename in files['new']]
 #    files['updated'] = [os.path.join(baseDir,filename) for filename in files['updated']]
 
@@ -305,6 +740,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         self.transferStartDate = ''
         self.systemStatus = ''
         self.bandwidthLimit = 0
+        self.adaptiveBWLimit = None
         self.cruiseDataTransfer = {}
         self.shipboardDataWarehouseConfig = {}
         super(OVDMGearmanWorker, self).__init__(host_list=[self.OVDM.getGearmanServer()])
@@ -318,15 +754,17 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         return {}
         
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
         #debugPrint("Payload:", json.dumps(payloadObj))
+        jobContext = self.OVDM.getJobContext()
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
         self.cruiseDataTransfer = self.getShipToShoreTransfer()
         self.bandwidthLimit = self.OVDM.getShipToShoreBWLimit()
         self.bandwidthLimitStatus = self.OVDM.getShipToShoreBWLimitStatus()
         self.cruiseID = self.OVDM.getCruiseID()
         self.transferStartDate = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
-        self.systemStatus = self.OVDM.getSystemStatus()
+        self.systemStatus = jobContext['systemStatus']
         
         if len(payloadObj) > 0:
 
@@ -368,6 +806,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         return super(OVDMGearmanWorker, self).on_job_exception(current_job, exc_info)
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
         
         # If the last part of the results failed
@@ -474,7 +913,7 @@ def task_runShipToShoreTransfer(worker, job):
     
     worker.send_job_status(job, 9, 10)
     
-    if job_results['files']['new'] or job_results['files']['updated']:
+    if job_results['files']['new'] or job_results['files']['updated'] or job_results['files'].get('bundled'):
     
         debugPrint("Building Logfiles")
 
@@ -487,6 +926,11 @@ def task_runShipToShoreTransfer(worker, job):
             logContents = {'files':{'new':[], 'updated':[]}}
             logContents['files']['new'] = job_results['files']['new']
             logContents['files']['updated'] = job_results['files']['updated']
+            logContents['files']['transferBytes'] = job_results['files']['transferBytes']
+            if 'bundled' in job_results['files']:
+                logContents['files']['bundled'] = job_results['files']['bundled']
+            if 'bandwidth' in job_results['files']:
+                logContents['files']['bandwidth'] = job_results['files']['bandwidth']
             #debugPrint('logContents',logContents)
             
             if writeLogFile(worker, logfileName, logContents['files']):
@@ -57,22 +57,20 @@ def errPrint(*args, **kwargs):
 
 def getJobInfo(worker):
 
-    collectionSystemTransfers = worker.OVDM.getCollectionSystemTransfers()
+    (collectionSystemTransfers, cruiseDataTransfers, requiredCruiseDataTransfers, tasks) = worker.OVDM.callConcurrent([(worker.OVDM.getCollectionSystemTransfers, ()), (worker.OVDM.getCruiseDataTransfers, ()), (worker.OVDM.getRequiredCruiseDataTransfers, ()), (worker.OVDM.getTasks, ())])
+
     for collectionSystemTransfer in collectionSystemTransfers:
         if collectionSystemTransfer['pid'] == worker.jobPID:
             return {'type': 'collectionSystemTransfer', 'id': collectionSystemTransfer['collectionSystemTransferID'], 'name': collectionSystemTransfer['name'], 'pid': collectionSystemTransfer['pid']}
             
-    cruiseDataTransfers = worker.OVDM.getCruiseDataTransfers()
     for cruiseDataTransfer in cruiseDataTransfers:
         if cruiseDataTransfer['pid'] != "0":
             return {'type': 'cruiseDataTransfer', 'id': cruiseDataTransfer['cruiseDataTransferID'], 'name': cruiseDataTransfer['name'], 'pid': cruiseDataTransfer['pid']}
     
-    cruiseDataTransfers = worker.OVDM.getRequiredCruiseDataTransfers()
-    for cruiseDataTransfer in cruiseDataTransfers:
+    for cruiseDataTransfer in requiredCruiseDataTransfers:
         if cruiseDataTransfer['pid'] != "0":
             return {'type': 'cruiseDataTransfer', 'id': cruiseDataTransfer['cruiseDataTransferID'], 'name': cruiseDataTransfer['name'], 'pid': cruiseDataTransfer['pid']}
     
-    tasks = worker.OVDM.getTasks()
     for task in tasks:
         if task['pid'] != "0":
             return {'type': 'task', 'id': task['taskID'], 'name': task['name'], 'pid': task['pid']}
@@ -91,6 +89,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         super(OVDMGearmanWorker, self).__init__(host_list=[self.OVDM.getGearmanServer()])
 
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
         self.jobPID = payloadObj['pid']
         self.jobInfo = getJobInfo(self)
@@ -107,6 +106,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         return super(OVDMGearmanWorker, self).on_job_exception(current_job, exc_info)
 
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         try:
             resultsObj = json.loads(job_results)
         
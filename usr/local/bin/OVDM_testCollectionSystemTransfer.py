@@ -376,6 +376,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
         
         
     def on_job_execute(self, current_job):
+        self.OVDM.clearCache()
         payloadObj = json.loads(current_job.data)
         self.shipboardDataWarehouseConfig = self.OVDM.getShipboardDataWarehouseConfig()
         self.cruiseID = self.OVDM.getCruiseID()
@@ -418,6 +419,7 @@ class OVDMGearmanWorker(gearman.GearmanWorker):
 
     
     def on_job_complete(self, current_job, job_results):
+        debugPrint('API cache:', json.dumps(self.OVDM.getCacheStats()))
         resultsObj = json.loads(job_results)
 
         debugPrint('Job Results:', json.dumps(resultsObj, indent=2))
@@ -0,0 +1,100 @@
+# ----------------------------------------------------------------------------------- #
+#
+#         FILE:  OVDM_unpackBundles.py
+#
+#  DESCRIPTION:  Shore-side utility that restores the files sent in ship-to-shore
+#                bundles and verifies their checksums.
+#
+#         BUGS:
+#        NOTES:  Requires openvdm_bundle.py in the same directory.  Run it from cron
+#                on the shore-side server, i.e.:
+#                python OVDM_unpackBundles.py <destDir>/OpenVDM_Bundles <destDir>
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  2.2
+#      CREATED:  2017-04-16
+#     REVISION:  2017-04-16
+#
+# LICENSE INFO: Open Vessel Data Management (OpenVDMv2)
+#               Copyright (C) OceanDataRat.org 2017
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/gpl-3.0.html>.
+#
+# ----------------------------------------------------------------------------------- #
+from __future__ import print_function
+import argparse
+import os
+import sys
+from openvdm_bundle import bundle_compression, bundleChecksumSuffix, unpack_bundle
+
+DEBUG = False
+
+
+def debugPrint(*args, **kwargs):
+    if DEBUG:
+        errPrint(*args, **kwargs)
+
+
+def errPrint(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def main(argv):
+
+    parser = argparse.ArgumentParser(description='Restore the files sent in ship-to-shore bundles')
+    parser.add_argument('-d', '--debug', action='store_true', help=' display debug messages')
+    parser.add_argument('--keep', action='store_true', help=' keep bundles after they are unpacked')
+    parser.add_argument('bundleDir', help='the directory containing the bundles')
+    parser.add_argument('destDir', help='the directory to restore the bundled files to')
+
+    args = parser.parse_args()
+    if args.debug:
+        global DEBUG
+        DEBUG = True
+        debugPrint("Running in debug mode")
+
+    # Bundles are only unpacked once their checksum file has arrived, rsync sends
+    # the checksum file after the bundle.
+    bundleFilenames = sorted([filename for filename in os.listdir(args.bundleDir) if bundle_compression(filename) and os.path.isfile(os.path.join(args.bundleDir, filename + bundleChecksumSuffix))])
+
+    returnCode = 0
+    for bundleFilename in bundleFilenames:
+        bundlePath = os.path.join(args.bundleDir, bundleFilename)
+        debugPrint("Unpacking", bundleFilename)
+
+        try:
+            (restored, failed) = unpack_bundle(bundlePath, args.destDir)
+        except (ValueError, IOError, OSError, EOFError) as e:
+            errPrint("Unable to unpack", bundleFilename + ":", e)
+            returnCode = 1
+            continue
+
+        debugPrint(len(restored), "file(s) restored")
+
+        if failed:
+            errPrint(len(failed), "file(s) in", bundleFilename, "failed verification:")
+            for filename in failed:
+                errPrint("   ", filename)
+            returnCode = 1
+            continue
+
+        if not args.keep:
+            os.remove(bundlePath)
+            os.remove(bundlePath + bundleChecksumSuffix)
+
+    return returnCode
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
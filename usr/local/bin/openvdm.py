@@ -33,7 +33,16 @@
 import requests
 import yaml
 import json
+import copy
+import time
 import datetime
+import threading
+from multiprocessing.pool import ThreadPool
+
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
 
 configFile = '/usr/local/etc/openvdm/openvdm.yaml'
 
@@ -44,6 +53,39 @@ class OpenVDM():
         self.config = {}
         self.config = self.parseOVDMConfig()
 
+        # Maximum number of API calls made at once by callConcurrent
+        try:
+            self.config['apiConcurrency']
+        except (KeyError, TypeError):
+            self.apiConcurrency = 8
+        else:
+            self.apiConcurrency = max(int(self.config['apiConcurrency']), 1)
+
+        # Each thread makes its API calls through its own keep-alive session, see
+        # getSession.  callConcurrent keeps its threads, and their sessions, for the
+        # life of the object.
+        self.sessions = threading.local()
+        self.pool = None
+
+        # Responses from config-type API endpoints are cached for cacheTTL seconds.
+        # cacheLock guards the cache, the indexes and the counters, which are
+        # shared with the callConcurrent threads.
+        self.cacheLock = threading.Lock()
+        self.cache = {}
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+        # Name and ID keyed indexes of cached lists, rebuilt when the list is
+        # refreshed
+        self.indexes = {}
+
+        try:
+            self.config['apiCache']['ttl']
+        except (KeyError, TypeError):
+            self.cacheTTL = 30
+        else:
+            self.cacheTTL = int(self.config['apiCache']['ttl'])
+
 
     def parseOVDMConfig(self):
 
@@ -51,9 +93,106 @@ class OpenVDM():
         return yaml.load(f.read())
 
 
+    def getSession(self):
+
+        # Returns the calling thread's requests session, requests does not
+        # guarantee a session can be used by several threads at once
+        try:
+            return self.sessions.session
+        except AttributeError:
+            self.sessions.session = requests.Session()
+            return self.sessions.session
+
+
+    def getJSON(self, url, cache=False):
+
+        # Returns the decoded API response.  With cache the response is reused
+        # until it is cacheTTL seconds old or clearCache is called.  Callers get
+        # their own copy so they can modify it.
+        if cache and self.cacheTTL > 0:
+            return copy.deepcopy(self.getCacheEntry(url)[1])
+
+        r = self.getSession().get(url)
+        return json.loads(r.text)
+
+
+    def getCacheEntry(self, url):
+
+        # Returns the (cachedTime, response) cache entry for url, fetching the
+        # response if it is not cached or has expired.  The response is shared,
+        # do not modify it.
+        with self.cacheLock:
+            try:
+                (cachedTime, returnVal) = self.cache[url]
+            except KeyError:
+                pass
+            else:
+                if time.time() - cachedTime < self.cacheTTL:
+                    self.cacheHits += 1
+                    return (cachedTime, returnVal)
+
+            self.cacheMisses += 1
+
+        r = self.getSession().get(url)
+        cacheEntry = (time.time(), json.loads(r.text))
+
+        if self.cacheTTL > 0:
+            with self.cacheLock:
+                self.cache[url] = cacheEntry
+
+        return cacheEntry
+
+
+    def getIndex(self, url, key):
+
+        # Returns the list returned by url as a dict keyed by key.  The index is
+        # built once per cached copy of the list.  Like a scan of the list, the
+        # first entry wins if key is not unique.
+        (cachedTime, returnVal) = self.getCacheEntry(url)
+
+        with self.cacheLock:
+            try:
+                (indexTime, index) = self.indexes[(url, key)]
+            except KeyError:
+                indexTime = None
+
+            if indexTime != cachedTime:
+                index = dict((row[key], row) for row in reversed(returnVal))
+                self.indexes[(url, key)] = (cachedTime, index)
+
+        return index
+
+
+    def callConcurrent(self, calls):
+
+        # Makes a list of (method, args) calls concurrently, at most apiConcurrency
+        # at a time, and returns their results in the same order.  Used to fan out
+        # bulk status updates and lookups that would otherwise wait on each other.
+        if len(calls) < 2:
+            return [method(*args) for (method, args) in calls]
+
+        if self.pool is None:
+            self.pool = ThreadPool(self.apiConcurrency)
+
+        return self.pool.map(lambda call: call[0](*call[1]), calls)
+
+
+    def clearCache(self):
+
+        with self.cacheLock:
+            self.cache = {}
+            self.indexes = {}
+
+
+    def getCacheStats(self):
+
+        with self.cacheLock:
+            return {'hits': self.cacheHits, 'misses': self.cacheMisses, 'entries': len(self.cache)}
+
+
     def clearGearmanJobsFromDB(self):
         url = self.config['siteRoot'] + 'api/gearman/clearAllJobsFromDB'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnObj = json.loads(r.text)
 
 
@@ -70,16 +209,70 @@ class OpenVDM():
     def getOVDMConfig(self):
 
         url = self.config['siteRoot'] + 'api/warehouse/getCruiseConfig'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnObj = json.loads(r.text)
         returnObj['configCreatedOn'] = datetime.datetime.utcnow().strftime("%Y/%m/%dT%H:%M:%SZ")
         return returnObj
 
     
+    def getJobContext(self, recordType=None, recordID=None):
+
+        # Returns the cruise ID and dates, data warehouse config, required extra
+        # directories, bandwidth and MD5 limits and system status in a single API
+        # call.  recordType (collectionSystemTransfer, cruiseDataTransfer or task)
+        # and recordID add the record the job is for under the recordType key.
+        # The config values are added to the cache so the individual getters
+        # called while the job runs do not go back to the API.
+        url = self.config['siteRoot'] + 'api/warehouse/getJobContext'
+        if recordType:
+            url += '/' + recordType + '/' + recordID
+
+        jobContext = self.getJSON(url)
+
+        if self.cacheTTL > 0:
+            cachedTime = time.time()
+            cacheEntries = {
+                'api/warehouse/getCruiseID': {'cruiseID': jobContext['cruiseID']},
+                'api/warehouse/getCruiseStartDate': {'cruiseStartDate': jobContext['cruiseStartDate']},
+                'api/warehouse/getCruiseEndDate': {'cruiseEndDate': jobContext['cruiseEndDate']},
+                'api/warehouse/getShipboardDataWarehouseConfig': jobContext['warehouseConfig'],
+                'api/extraDirectories/getRequiredExtraDirectories': jobContext['requiredExtraDirectories'],
+                'api/warehouse/getShipToShoreBWLimit': {'shipToShoreBWLimit': jobContext['shipToShoreBWLimit']},
+                'api/warehouse/getShipToShoreBWLimitStatus': {'shipToShoreBWLimitStatus': jobContext['shipToShoreBWLimitStatus']},
+                'api/warehouse/getMD5FilesizeLimit': {'md5FilesizeLimit': jobContext['md5FilesizeLimit']},
+                'api/warehouse/getMD5FilesizeLimitStatus': {'md5FilesizeLimitStatus': jobContext['md5FilesizeLimitStatus']}
+            }
+            with self.cacheLock:
+                for (endpoint, returnVal) in cacheEntries.items():
+                    self.cache[self.config['siteRoot'] + endpoint] = (cachedTime, copy.deepcopy(returnVal))
+
+        return jobContext
+
+    
     def getDashboardDataProcessingScriptSuffix(self):
         
         return self.config['dashboardData']['processingScriptSuffix']
 
+
+    def getDashboardDataProcessingWorkers(self):
+
+        try:
+            self.config['dashboardData']['processingWorkers']
+        except (KeyError, TypeError):
+            return 1
+        else:
+            return max(int(self.config['dashboardData']['processingWorkers']), 1)
+
+
+    def getDashboardDataShardManifest(self):
+
+        try:
+            self.config['dashboardData']['shardManifest']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['dashboardData']['shardManifest'] == True
+
     
     def getGearmanServer(self):
         
@@ -94,18 +287,96 @@ class OpenVDM():
     def getMD5FilesizeLimit(self):
 
         url = self.config['siteRoot'] + 'api/warehouse/getMD5FilesizeLimit'
-        r = requests.get(url)
-        returnObj = json.loads(r.text)
+        returnObj = self.getJSON(url, True)
         return returnObj['md5FilesizeLimit']
 
     
     def getMD5FilesizeLimitStatus(self):
 
         url = self.config['siteRoot'] + 'api/warehouse/getMD5FilesizeLimitStatus'
-        r = requests.get(url)
-        returnObj = json.loads(r.text)
+        returnObj = self.getJSON(url, True)
         return returnObj['md5FilesizeLimitStatus']
-    
+
+
+    def getMD5HashBufferSize(self):
+
+        try:
+            self.config['md5Summary']['hashBufferSize']
+        except (KeyError, TypeError):
+            return 4 * 1024 * 1024
+        else:
+            return int(self.config['md5Summary']['hashBufferSize']) * 1024 * 1024
+
+
+    def getMD5HashWorkers(self):
+
+        try:
+            self.config['md5Summary']['hashWorkers']
+        except (KeyError, TypeError):
+            return 1
+        else:
+            return max(int(self.config['md5Summary']['hashWorkers']), 1)
+
+
+    def getHashAlgorithms(self):
+
+        try:
+            self.config['md5Summary']['algorithms']
+        except (KeyError, TypeError):
+            return ['md5']
+        else:
+            return self.config['md5Summary']['algorithms']
+
+
+    def getHashDuringTransfer(self):
+
+        try:
+            self.config['md5Summary']['hashDuringTransfer']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['md5Summary']['hashDuringTransfer'] == True
+
+
+    def getMD5SummaryJournal(self):
+
+        try:
+            self.config['md5Summary']['journal']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['md5Summary']['journal'] == True
+
+
+    def getMD5SummaryJournalMaxRecords(self):
+
+        try:
+            self.config['md5Summary']['journalMaxRecords']
+        except (KeyError, TypeError):
+            return 10000
+        else:
+            return int(self.config['md5Summary']['journalMaxRecords'])
+
+
+    def getMD5SummaryCompactionIdleTime(self):
+
+        try:
+            self.config['md5Summary']['compactionIdleTime']
+        except (KeyError, TypeError):
+            return 30 * 60
+        else:
+            return int(self.config['md5Summary']['compactionIdleTime']) * 60
+
+
+    def getCollectionSystemTransferSourceIndex(self):
+
+        try:
+            self.config['collectionSystemTransfer']['sourceIndex']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['collectionSystemTransfer']['sourceIndex'] == True
+
 
     def getTasksForHook(self, name):        
         
@@ -125,65 +396,67 @@ class OpenVDM():
     def getCruiseID(self):
         
         url = self.config['siteRoot'] + 'api/warehouse/getCruiseID'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal['cruiseID']
     
     
     def getCruiseStartDate(self):
         
         url = self.config['siteRoot'] + 'api/warehouse/getCruiseStartDate'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal['cruiseStartDate']
     
     
     def getCruiseEndDate(self):
         
         url = self.config['siteRoot'] + 'api/warehouse/getCruiseEndDate'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal['cruiseEndDate']
     
     
     def getExtraDirectory(self, extraDirectoryID):
         
+        for url in [self.config['siteRoot'] + 'api/extraDirectories/getExtraDirectories', self.config['siteRoot'] + 'api/extraDirectories/getRequiredExtraDirectories']:
+            index = self.getIndex(url, 'extraDirectoryID')
+            if extraDirectoryID in index:
+                return copy.deepcopy(index[extraDirectoryID])
+
         url = self.config['siteRoot'] + 'api/extraDirectories/getExtraDirectory/' + extraDirectoryID
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url)
         return returnVal[0]
     
     def getExtraDirectoryByName(self, extraDirectoryName):
 
-        extraDirectories = self.getExtraDirectories()
-        for extraDirectory in extraDirectories:
-            if extraDirectory['name'] == extraDirectoryName:
-                return extraDirectory
+        url = self.config['siteRoot'] + 'api/extraDirectories/getExtraDirectories'
+        index = self.getIndex(url, 'name')
+        if extraDirectoryName in index:
+            return copy.deepcopy(index[extraDirectoryName])
             
         return False
     
     def getExtraDirectories(self):
         
         url = self.config['siteRoot'] + 'api/extraDirectories/getExtraDirectories'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal
     
     
     def getRequiredExtraDirectory(self, extraDirectoryID):
         
-        url = self.config['siteRoot'] + 'api/extraDirectories/getRequiredExtraDirectory/' + extraDirectoryID
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
-        return returnVal[0]
+        url = self.config['siteRoot'] + 'api/extraDirectories/getRequiredExtraDirectories'
+        index = self.getIndex(url, 'extraDirectoryID')
+        if extraDirectoryID in index:
+            return copy.deepcopy(index[extraDirectoryID])
+
+        return False
     
     
     def getRequiredExtraDirectoryByName(self, extraDirectoryName):
 
-        extraDirectories = self.getRequiredExtraDirectories()
-        for extraDirectory in extraDirectories:
-            if extraDirectory['name'] == extraDirectoryName:
-                return extraDirectory
+        url = self.config['siteRoot'] + 'api/extraDirectories/getRequiredExtraDirectories'
+        index = self.getIndex(url, 'name')
+        if extraDirectoryName in index:
+            return copy.deepcopy(index[extraDirectoryName])
             
         return False
     
@@ -191,60 +464,144 @@ class OpenVDM():
     def getRequiredExtraDirectories(self):
         
         url = self.config['siteRoot'] + 'api/extraDirectories/getRequiredExtraDirectories'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal
     
     
     def getShipboardDataWarehouseConfig(self):
         
         url = self.config['siteRoot'] + 'api/warehouse/getShipboardDataWarehouseConfig'
-        r = requests.get(url)
-        returnVal = json.loads(r.text)
+        returnVal = self.getJSON(url, True)
         return returnVal
     
     
     def getShipToShoreBWLimit(self):
         
         url = self.config['siteRoot'] + 'api/warehouse/getShipToShoreBWLimit'
-        r = requests.get(url)
-        returnObj = json.loads(r.text)
+        returnObj = self.getJSON(url, True)
         return returnObj['shipToShoreBWLimit']
 
 
     def getShipToShoreBWLimitStatus(self):
 
         url = self.config['siteRoot'] + 'api/warehouse/getShipToShoreBWLimitStatus'
-        r = requests.get(url)
-        returnObj = json.loads(r.text)
+        returnObj = self.getJSON(url, True)
         return returnObj['shipToShoreBWLimitStatus'] == "On"
     
     
+    def getShipToShorePriorityBudget(self, priority):
+
+        try:
+            self.config['shipToShoreTransfer']['priorityBudgets'][priority]
+        except (KeyError, TypeError):
+            return 0
+        else:
+            return int(self.config['shipToShoreTransfer']['priorityBudgets'][priority]) * 1024 * 1024
+
+
+    def getShipToShoreAdaptiveBWLimit(self):
+
+        try:
+            self.config['shipToShoreTransfer']['adaptiveBWLimit']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['shipToShoreTransfer']['adaptiveBWLimit'] == True
+
+
+    def getShipToShoreBWLimitBounds(self):
+
+        try:
+            self.config['shipToShoreTransfer']['minBWLimit']
+            self.config['shipToShoreTransfer']['maxBWLimit']
+        except (KeyError, TypeError):
+            return (8, 1024)
+        else:
+            return (int(self.config['shipToShoreTransfer']['minBWLimit']), int(self.config['shipToShoreTransfer']['maxBWLimit']))
+
+
+    def getShipToShoreAdaptiveInterval(self):
+
+        try:
+            self.config['shipToShoreTransfer']['adaptiveInterval']
+        except (KeyError, TypeError):
+            return 60
+        else:
+            return int(self.config['shipToShoreTransfer']['adaptiveInterval'])
+
+
+    def getShipToShoreRTTProbePort(self):
+
+        try:
+            self.config['shipToShoreTransfer']['rttProbePort']
+        except (KeyError, TypeError):
+            return 22
+        else:
+            return int(self.config['shipToShoreTransfer']['rttProbePort'])
+
+
+    def getShipToShoreRTTProbeInterval(self):
+
+        try:
+            self.config['shipToShoreTransfer']['rttProbeInterval']
+        except (KeyError, TypeError):
+            return 0
+        else:
+            return int(self.config['shipToShoreTransfer']['rttProbeInterval'])
+
+
+    def getShipToShoreBundleFiles(self):
+
+        try:
+            self.config['shipToShoreTransfer']['bundleFiles']
+        except (KeyError, TypeError):
+            return False
+        else:
+            return self.config['shipToShoreTransfer']['bundleFiles'] == True
+
+
+    def getShipToShoreBundleMaxFileSize(self):
+
+        try:
+            self.config['shipToShoreTransfer']['bundleMaxFileSize']
+        except (KeyError, TypeError):
+            return 64 * 1024
+        else:
+            return int(self.config['shipToShoreTransfer']['bundleMaxFileSize']) * 1024
+
+
+    def getShipToShoreBundleCompression(self):
+
+        try:
+            self.config['shipToShoreTransfer']['bundleCompression']
+        except (KeyError, TypeError):
+            return 'xz'
+        else:
+            return self.config['shipToShoreTransfer']['bundleCompression']
+
+
     def getShipToShoreTransfer(self, shipToShoreTransferID):
 
         url = self.config['siteRoot'] + 'api/shipToShoreTransfers/getShipToShoreTransfer/' + shipToShoreTransferID
-        r = requests.get(url)
-        return json.loads(r.text)[0]
+        return self.getJSON(url, True)[0]
     
     
     def getShipToShoreTransfers(self):
 
         url = self.config['siteRoot'] + 'api/shipToShoreTransfers/getShipToShoreTransfers'
-        r = requests.get(url)
-        return json.loads(r.text)
+        return self.getJSON(url, True)
 
     
     def getRequiredShipToShoreTransfers(self):
 
         url = self.config['siteRoot'] + 'api/shipToShoreTransfers/getRequiredShipToShoreTransfers'
-        r = requests.get(url)
-        return json.loads(r.text)
+        return self.getJSON(url, True)
 
     
     def getSystemStatus(self):
 
         url = self.config['siteRoot'] + 'api/warehouse/getSystemStatus'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal['systemStatus']
     
@@ -252,7 +609,7 @@ class OpenVDM():
     def getTasks(self):
 
         url = self.config['siteRoot'] + 'api/tasks/getTasks'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal
 
@@ -260,7 +617,7 @@ class OpenVDM():
     def getTask(self, taskID):
 
         url = self.config['siteRoot'] + 'api/tasks/getTask/' + taskID
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
 
         if len(returnVal) > 0:
@@ -272,7 +629,7 @@ class OpenVDM():
     def getCollectionSystemTransfers(self):
 
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/getCollectionSystemTransfers'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal
 
@@ -280,7 +637,7 @@ class OpenVDM():
     def getCollectionSystemTransfer(self, collectionSystemTransferID):
 
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/getCollectionSystemTransfer/' + collectionSystemTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         if(len(returnVal)):
             return returnVal[0]
@@ -289,17 +646,29 @@ class OpenVDM():
     
     def getCollectionSystemTransferByName(self, collectionSystemTransferName):
 
-        collectionSystemTransfers = self.getCollectionSystemTransfers()
-        for collectionSystemTransfer in collectionSystemTransfers:
+        # Not cached, the transfer includes its current status
+        url = self.config['siteRoot'] + 'api/collectionSystemTransfers/getCollectionSystemTransferByName/' + quote(collectionSystemTransferName, '')
+        try:
+            returnVal = self.getJSON(url)
+        except ValueError:
+            # Not JSON, i.e. an error page.  Apache answers 404 for a name with
+            # an encoded "/" unless AllowEncodedSlashes is on.
+            returnVal = []
+
+        if(len(returnVal)):
+            return returnVal[0]
+
+        # Fall back to scanning the full list
+        for collectionSystemTransfer in self.getCollectionSystemTransfers():
             if collectionSystemTransfer['name'] == collectionSystemTransferName:
                 return collectionSystemTransfer
-        
+
         return False
     
     def getCruiseDataTransfers(self):
 
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/getCruiseDataTransfers'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal
     
@@ -307,7 +676,7 @@ class OpenVDM():
     def getRequiredCruiseDataTransfers(self):
 
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/getRequiredCruiseDataTransfers'
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal
     
@@ -315,7 +684,7 @@ class OpenVDM():
     def getCruiseDataTransfer(self, cruiseDataTransferID):
 
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/getCruiseDataTransfer/' + cruiseDataTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
         returnVal = json.loads(r.text)
         return returnVal[0]
     
@@ -324,7 +693,7 @@ class OpenVDM():
 
         url = self.config['siteRoot'] + 'api/messages/newMessage'
         payload = {'messageTitle': messageTitle, 'messageBody':messageBody}
-        r = requests.post(url, data=payload)
+        r = self.getSession().post(url, data=payload)
         return r.text
 
     def clearError_collectionSystemTransfer(self, collectionSystemTransferID, jobStatus):
@@ -332,7 +701,7 @@ class OpenVDM():
         if jobStatus == "3":
             # Clear Error for current tranfer in DB via API
             url = self.config['siteRoot'] + 'api/collectionSystemTransfers/setIdleCollectionSystemTransfer/' + collectionSystemTransferID
-            r = requests.get(url)
+            r = self.getSession().get(url)
             
             
     def clearError_cruiseDataTransfer(self, cruiseDataTransferID, jobStatus):
@@ -340,7 +709,7 @@ class OpenVDM():
         if jobStatus == "3":
             # Clear Error for current tranfer in DB via API
             url = self.config['siteRoot'] + 'api/cruiseDataTransfers/setIdleCruiseDataTransfer/' + cruiseDataTransferID
-            r = requests.get(url)
+            r = self.getSession().get(url)
             
             
     def clearError_task(self, taskID):
@@ -355,7 +724,7 @@ class OpenVDM():
 
         # Set Error for current tranfer in DB via API
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/setErrorCollectionSystemTransfer/' + collectionSystemTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
     
         collectionSystemTransferName = self.getCollectionSystemTransfer(collectionSystemTransferID)['name']
         
@@ -368,7 +737,7 @@ class OpenVDM():
 
         # Set Error for current tranfer test in DB via API
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/setErrorCollectionSystemTransfer/' + collectionSystemTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
         
         collectionSystemTransferName = self.getCollectionSystemTransfer(collectionSystemTransferID)['name']
         
@@ -381,7 +750,7 @@ class OpenVDM():
 
         # Set Error for current tranfer in DB via API
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/setErrorCruiseDataTransfer/' + cruiseDataTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
     
         cruiseDataTransferName = self.getCruiseDataTransfer(cruiseDataTransferID)['name']
         title = cruiseDataTransferName + ' Data Transfer failed'
@@ -393,7 +762,7 @@ class OpenVDM():
 
         # Set Error for current tranfer test in DB via API
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/setErrorCruiseDataTransfer/' + cruiseDataTransferID
-        r = requests.get(url)
+        r = self.getSession().get(url)
         
         cruiseDataTransferName = self.getCruiseDataTransfer(cruiseDataTransferID)['name']
         title = cruiseDataTransferName + ' Connection test failed'
@@ -405,7 +774,7 @@ class OpenVDM():
        
         # Set Error for current task in DB via API
         url = self.config['siteRoot'] + 'api/tasks/setErrorTask/' + taskID
-        r = requests.get(url)
+        r = self.getSession().get(url)
     
         taskName = self.getTask(taskID)['longName']
         title = taskName + ' failed'
@@ -417,21 +786,21 @@ class OpenVDM():
 
         # Set Error for current tranfer in DB via API
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/setIdleCollectionSystemTransfer/' + collectionSystemTransferID
-        r = requests.get(url) 
+        r = self.getSession().get(url) 
         
     
     def setIdle_cruiseDataTransfer(self, cruiseDataTransferID):
 
         # Set Error for current tranfer in DB via API
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/setIdleCruiseDataTransfer/' + cruiseDataTransferID
-        r = requests.get(url) 
+        r = self.getSession().get(url) 
 
     
     def setIdle_task(self, taskID):
         
         # Set Idle for the tasks in DB via API
         url = self.config['siteRoot'] + 'api/tasks/setIdleTask/' + taskID
-        r = requests.get(url)
+        r = self.getSession().get(url)
     
     
     def setRunning_collectionSystemTransfer(self, collectionSystemTransferID, jobPID, jobHandle):
@@ -441,7 +810,7 @@ class OpenVDM():
         #print "Set Running for current tranfer in DB via API"
         url = self.config['siteRoot'] + 'api/collectionSystemTransfers/setRunningCollectionSystemTransfer/' + collectionSystemTransferID
         payload = {'jobPid': jobPID}
-        r = requests.post(url, data=payload)
+        r = self.getSession().post(url, data=payload)
 
         # Add to gearman job tracker
         self.trackGearmanJob('Transfer for ' + collectionSystemTransferName, jobPID, jobHandle)        
@@ -462,7 +831,7 @@ class OpenVDM():
         #print "Set Running for current tranfer in DB via API"
         url = self.config['siteRoot'] + 'api/cruiseDataTransfers/setRunningCruiseDataTransfer/' + cruiseDataTransferID
         payload = {'jobPid': jobPID}
-        r = requests.post(url, data=payload)
+        r = self.getSession().post(url, data=payload)
 
         # Add to gearman job tracker
         self.trackGearmanJob('Transfer for ' + cruiseDataTransferName, jobPID, jobHandle) 
@@ -483,7 +852,7 @@ class OpenVDM():
         # Set Running for the tasks in DB via API
         url = self.config['siteRoot'] + 'api/tasks/setRunningTask/' + taskID
         payload = {'jobPid': jobPID}
-        r = requests.post(url, data=payload)
+        r = self.getSession().post(url, data=payload)
 
         # Add to gearman job tracker
         self.trackGearmanJob(taskName, jobPID, jobHandle)        
@@ -494,4 +863,4 @@ class OpenVDM():
         # Add Job to DB via API
         url = self.config['siteRoot'] + 'api/gearman/newJob/' + jobHandle
         payload = {'jobName': jobName, 'jobPid': jobPID}
-        r = requests.post(url, data=payload)
+        r = self.getSession().post(url, data=payload)
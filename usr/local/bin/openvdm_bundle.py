@@ -0,0 +1,304 @@
+# ----------------------------------------------------------------------------------- #
+#
+#         FILE:  openvdm_bundle.py
+#
+#  DESCRIPTION:  Writes and unpacks the compressed file bundles used by ship-to-shore
+#                transfers.
+#
+#         BUGS:
+#        NOTES:  Only requires the python standard library so it can be copied to the
+#                shore-side server along with OVDM_unpackBundles.py.
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  2.2
+#      CREATED:  2017-04-16
+#     REVISION:  2017-04-16
+#
+# LICENSE INFO: Open Vessel Data Management (OpenVDMv2)
+#               Copyright (C) OceanDataRat.org 2017
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/gpl-3.0.html>.
+#
+# ----------------------------------------------------------------------------------- #
+from __future__ import print_function
+import os
+import io
+import sys
+import gzip
+import json
+import time
+import hashlib
+import tarfile
+import tempfile
+
+# xz is part of python 3.3+, the backports.lzma module provides it for python 2
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# A bundle is a tar stream holding MANIFEST.json followed by the bundled files,
+# compressed with one of bundleCompressions.  Each bundle is sent with a checksum
+# file (<bundle>.md5) holding the md5 of the compressed bundle.
+bundleCompressions = {'zstd': '.tar.zst', 'xz': '.tar.xz', 'gz': '.tar.gz'}
+bundleManifest = 'MANIFEST.json'
+bundleChecksumSuffix = '.md5'
+
+bufferSize = 1024 * 1024
+
+
+def errPrint(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def available_compression(compression):
+
+    # Returns compression if it is available on this system, gz otherwise
+    if compression == 'zstd' and zstandard:
+        return compression
+    elif compression == 'xz' and lzma:
+        return compression
+    elif compression != 'gz':
+        errPrint("Bundle compression", compression, "not available, using gz")
+
+    return 'gz'
+
+
+def bundle_compression(bundleFilename):
+
+    # Returns the compression used by a bundle, None if the file is not a bundle
+    for (compression, suffix) in bundleCompressions.items():
+        if bundleFilename.endswith(suffix):
+            return compression
+
+    return None
+
+
+def _open_compressed(bundleFile, compression, mode):
+
+    # Wraps an open file object with the (de)compressor.  The caller closes both.
+    if compression == 'zstd':
+        if mode == 'wb':
+            return zstandard.ZstdCompressor().stream_writer(bundleFile)
+        return zstandard.ZstdDecompressor().stream_reader(bundleFile)
+    elif compression == 'xz':
+        return lzma.LZMAFile(bundleFile, mode)
+
+    return gzip.GzipFile(fileobj=bundleFile, mode=mode)
+
+
+def _md5_file(filePath):
+
+    fileHash = hashlib.md5()
+    with io.open(filePath, 'rb') as fileToHash:
+        for chunk in iter(lambda: fileToHash.read(bufferSize), b''):
+            fileHash.update(chunk)
+
+    return fileHash.hexdigest()
+
+
+def _spool_file(sourceFile, size, spoolFile):
+
+    # Copies at most size bytes of sourceFile to spoolFile.  Returns the number of
+    # bytes copied and their md5, fewer than size if the file was truncated.
+    fileHash = hashlib.md5()
+    remaining = size
+    while remaining > 0:
+        chunk = sourceFile.read(min(bufferSize, remaining))
+        if not chunk:
+            break
+        fileHash.update(chunk)
+        spoolFile.write(chunk)
+        remaining -= len(chunk)
+
+    return (size - remaining, fileHash.hexdigest())
+
+
+def write_bundle(baseDir, filenames, bundleDir, bundleName, compression='xz'):
+
+    # Packs the files (paths relative to baseDir) into bundleDir/bundleName<suffix>
+    # and writes the checksum file next to it.  Files that can not be read are
+    # skipped.  Returns (bundleFilename, checksumFilename, bundledFilenames).
+    compression = available_compression(compression)
+    bundleFilename = bundleName + bundleCompressions[compression]
+    bundlePath = os.path.join(bundleDir, bundleFilename)
+
+    # Each file is opened once and copied into a spool file while it is hashed, so
+    # the size and md5 in the manifest describe exactly the bytes bundled even if
+    # the file grows in the meantime.  The manifest has to lead the bundle, the
+    # tar pass reads the files back from the spool.
+    manifest = {'created': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), 'files': {}}
+    bundledFiles = []
+
+    with tempfile.TemporaryFile(dir=bundleDir) as spoolFile:
+        for filename in filenames:
+            if filename in manifest['files']:
+                continue
+
+            filePath = os.path.join(baseDir, filename)
+            try:
+                with io.open(filePath, 'rb') as fileToBundle:
+                    fileStat = os.fstat(fileToBundle.fileno())
+                    (fileSize, fileMD5) = _spool_file(fileToBundle, fileStat.st_size, spoolFile)
+            except (IOError, OSError) as e:
+                errPrint("Unable to read", filePath + ":", e)
+                continue
+
+            manifest['files'][filename] = {'size': fileSize, 'mtime': fileStat.st_mtime, 'md5': fileMD5}
+            bundledFiles.append(filename)
+
+        manifestData = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+        spoolFile.seek(0)
+
+        with io.open(bundlePath, 'wb') as bundleFile:
+            compressedFile = _open_compressed(bundleFile, compression, 'wb')
+            try:
+                tar = tarfile.open(fileobj=compressedFile, mode='w|')
+                try:
+                    manifestInfo = tarfile.TarInfo(bundleManifest)
+                    manifestInfo.size = len(manifestData)
+                    manifestInfo.mtime = time.time()
+                    manifestInfo.mode = 0o644
+                    tar.addfile(manifestInfo, io.BytesIO(manifestData))
+
+                    # addfile reads exactly size bytes, the spool is read in the
+                    # order it was written
+                    for filename in bundledFiles:
+                        fileInfo = manifest['files'][filename]
+                        tarInfo = tarfile.TarInfo(filename)
+                        tarInfo.size = fileInfo['size']
+                        tarInfo.mtime = fileInfo['mtime']
+                        tarInfo.mode = 0o644
+                        tar.addfile(tarInfo, spoolFile)
+                finally:
+                    tar.close()
+            finally:
+                compressedFile.close()
+
+    checksumFilename = bundleFilename + bundleChecksumSuffix
+    with open(os.path.join(bundleDir, checksumFilename), 'w') as checksumFile:
+        checksumFile.write(_md5_file(bundlePath) + '  ' + bundleFilename + '\n')
+
+    return (bundleFilename, checksumFilename, sorted(bundledFiles))
+
+
+def _safe_path(destDir, filename):
+
+    # Returns the destination path for a bundled file, None if it would land
+    # outside destDir
+    if os.path.isabs(filename) or '..' in filename.split('/'):
+        return None
+
+    return os.path.join(destDir, filename)
+
+
+def unpack_bundle(bundlePath, destDir):
+
+    # Restores the files in a bundle below destDir, verifying the bundle against
+    # its checksum file and every file against the manifest.  A file is only moved
+    # into place once its md5 has been verified.  Returns (restored, failed).
+    restored = []
+    failed = []
+
+    compression = bundle_compression(bundlePath)
+    if compression is None or (compression == 'zstd' and not zstandard) or (compression == 'xz' and not lzma):
+        raise ValueError('Unsupported bundle compression: ' + os.path.basename(bundlePath))
+
+    try:
+        with open(bundlePath + bundleChecksumSuffix, 'r') as checksumFile:
+            checksum = checksumFile.read().split()[0]
+    except (IOError, OSError, IndexError):
+        raise ValueError('Missing or empty checksum file for ' + os.path.basename(bundlePath))
+
+    if _md5_file(bundlePath) != checksum:
+        raise ValueError('Checksum mismatch for ' + os.path.basename(bundlePath))
+
+    with io.open(bundlePath, 'rb') as bundleFile:
+        compressedFile = _open_compressed(bundleFile, compression, 'rb')
+        try:
+            tar = tarfile.open(fileobj=compressedFile, mode='r|')
+            try:
+                manifest = None
+                for tarInfo in tar:
+                    if manifest is None:
+                        if tarInfo.name != bundleManifest:
+                            raise ValueError('Bundle does not start with a manifest: ' + os.path.basename(bundlePath))
+                        manifest = json.loads(tar.extractfile(tarInfo).read().decode('utf-8'))
+                        continue
+
+                    if not tarInfo.isfile():
+                        continue
+
+                    filePath = _safe_path(destDir, tarInfo.name)
+                    fileInfo = manifest['files'].get(tarInfo.name)
+                    if filePath is None or fileInfo is None:
+                        errPrint("Skipping unexpected bundle entry:", tarInfo.name)
+                        failed.append(tarInfo.name)
+                        continue
+
+                    if unpack_file(tar.extractfile(tarInfo), filePath, fileInfo):
+                        restored.append(tarInfo.name)
+                    else:
+                        failed.append(tarInfo.name)
+            finally:
+                tar.close()
+        finally:
+            compressedFile.close()
+
+    if manifest is not None:
+        failed += [filename for filename in manifest['files'] if filename not in restored and filename not in failed]
+
+    return (restored, failed)
+
+
+def unpack_file(sourceFile, filePath, fileInfo):
+
+    # Writes a bundled file to a temporary file next to filePath and renames it
+    # into place if the md5 matches the manifest
+    fileDir = os.path.dirname(filePath)
+    if not os.path.isdir(fileDir):
+        os.makedirs(fileDir)
+
+    (tmpFD, tmpFilePath) = tempfile.mkstemp(prefix='.' + os.path.basename(filePath) + '.', dir=fileDir)
+
+    try:
+        fileHash = hashlib.md5()
+        with io.open(tmpFD, 'wb') as destFile:
+            for chunk in iter(lambda: sourceFile.read(bufferSize), b''):
+                fileHash.update(chunk)
+                destFile.write(chunk)
+
+        if fileHash.hexdigest() != fileInfo['md5']:
+            errPrint("Checksum mismatch:", filePath)
+            os.remove(tmpFilePath)
+            return False
+
+        os.chmod(tmpFilePath, 0o644)
+        os.utime(tmpFilePath, (fileInfo['mtime'], fileInfo['mtime']))
+        os.rename(tmpFilePath, filePath)
+
+    except:
+        if os.path.isfile(tmpFilePath):
+            os.remove(tmpFilePath)
+        raise
+
+    return True
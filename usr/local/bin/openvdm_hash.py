@@ -0,0 +1,172 @@
+# ----------------------------------------------------------------------------------- #
+#
+#         FILE:  openvdm_hash.py
+#
+#  DESCRIPTION:  Hashing helpers shared by the OpenVDM Gearman workers.
+#
+#         BUGS:
+#        NOTES:
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  2.2
+#      CREATED:  2017-04-09
+#     REVISION:  2017-04-09
+#
+# LICENSE INFO: Open Vessel Data Management (OpenVDMv2)
+#               Copyright (C) OceanDataRat.org 2017
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/gpl-3.0.html>.
+#
+# ----------------------------------------------------------------------------------- #
+from __future__ import print_function
+import os
+import sys
+import io
+import time
+import hashlib
+import tempfile
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import pyblake2
+except ImportError:
+    pyblake2 = None
+
+# Hash algorithms that can be used to build summaries.  Each algorithm gets its own
+# summary, checksum and journal file, i.e. SHA256_Summary.txt, SHA256_Summary.sha256
+hashAlgorithms = ['md5', 'sha1', 'sha256', 'blake2b', 'xxh3']
+
+
+def errPrint(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def new_hash(algorithm):
+
+    if algorithm == 'blake2b':
+        if hasattr(hashlib, 'blake2b'):
+            return hashlib.blake2b()
+        elif pyblake2:
+            return pyblake2.blake2b()
+        raise ValueError('blake2b requires python 3.6+ or the pyblake2 module')
+
+    elif algorithm == 'xxh3':
+        if xxhash and hasattr(xxhash, 'xxh3_64'):
+            return xxhash.xxh3_64()
+        raise ValueError('xxh3 requires the xxhash module')
+
+    return hashlib.new(algorithm)
+
+
+def available_hashAlgorithms(algorithms):
+
+    # Returns the requested hash algorithms that are available on this system
+    returnAlgorithms = []
+    for algorithm in algorithms:
+        if algorithm not in hashAlgorithms:
+            errPrint("Unknown hash algorithm:", algorithm)
+            continue
+
+        try:
+            new_hash(algorithm)
+        except ValueError as e:
+            errPrint("Hash algorithm", algorithm, "not available:", e)
+            continue
+
+        returnAlgorithms.append(algorithm)
+
+    if not returnAlgorithms:
+        errPrint("No usable hash algorithms configured, defaulting to md5")
+        returnAlgorithms = ['md5']
+
+    return returnAlgorithms
+
+
+def hash_file(filePath, buf, algorithms=['md5']):
+
+    # Stream the file through every requested hash in a single pass using a reused
+    # buffer so memory usage is constant regardless of the size of the file.
+    fileHashes = [new_hash(algorithm) for algorithm in algorithms]
+    bufView = memoryview(buf)
+    bytesRead = 0
+
+    with io.open(filePath, 'rb', buffering=0) as file_to_check:
+        while True:
+            length = file_to_check.readinto(buf)
+            if not length:
+                break
+            for fileHash in fileHashes:
+                fileHash.update(bufView[:length])
+            bytesRead += length
+
+    # here's how you get the md5 of the file name... not too useful but was a funny bug caught by Bob Arko.
+    #md5.update(filePath)
+
+    return (dict(zip(algorithms, [fileHash.hexdigest() for fileHash in fileHashes])), bytesRead)
+
+
+def copy_file(sourceFilePath, destFilePath, buf, algorithms=['md5'], bandwidthLimit=0):
+
+    # Copy the file and hash it in the same pass so the copy never has to be read
+    # back.  The copy is written to a temporary file next to the destination and
+    # renamed into place once complete, the source modification time is preserved
+    # (rsync -t).  bandwidthLimit is in KB/s, 0 for no limit.
+    fileHashes = [new_hash(algorithm) for algorithm in algorithms]
+    bufView = memoryview(buf)
+    bytesCopied = 0
+    startTime = time.time()
+
+    sourceStat = os.stat(sourceFilePath)
+
+    destDir = os.path.dirname(destFilePath)
+    if not os.path.isdir(destDir):
+        os.makedirs(destDir)
+
+    (tmpFD, tmpFilePath) = tempfile.mkstemp(prefix='.' + os.path.basename(destFilePath) + '.', dir=destDir)
+
+    try:
+        with io.open(sourceFilePath, 'rb', buffering=0) as sourceFile:
+            with io.open(tmpFD, 'wb', buffering=0) as destFile:
+                while True:
+                    length = sourceFile.readinto(buf)
+                    if not length:
+                        break
+                    for fileHash in fileHashes:
+                        fileHash.update(bufView[:length])
+
+                    written = 0
+                    while written < length:
+                        written += destFile.write(bufView[written:length])
+
+                    bytesCopied += length
+
+                    if bandwidthLimit > 0:
+                        delay = float(bytesCopied) / (bandwidthLimit * 1024) - (time.time() - startTime)
+                        if delay > 0:
+                            time.sleep(delay)
+
+        os.chmod(tmpFilePath, 0644)
+        os.utime(tmpFilePath, (sourceStat.st_atime, sourceStat.st_mtime))
+        os.rename(tmpFilePath, destFilePath)
+
+    except:
+        if os.path.isfile(tmpFilePath):
+            os.remove(tmpFilePath)
+        raise
+
+    return (dict(zip(algorithms, [fileHash.hexdigest() for fileHash in fileHashes])), bytesCopied)
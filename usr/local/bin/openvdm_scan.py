@@ -0,0 +1,191 @@
+# ----------------------------------------------------------------------------------- #
+#
+#         FILE:  openvdm_scan.py
+#
+#  DESCRIPTION:  Directory scanner and filename filter matcher shared by the OpenVDM
+#                Gearman workers.
+#
+#         BUGS:
+#        NOTES:
+#       AUTHOR:  Webb Pinner
+#      COMPANY:  Capable Solutions
+#      VERSION:  2.2
+#      CREATED:  2017-04-09
+#     REVISION:  2017-04-09
+#
+# LICENSE INFO: Open Vessel Data Management (OpenVDMv2)
+#               Copyright (C) OceanDataRat.org 2017
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/gpl-3.0.html>.
+#
+# ----------------------------------------------------------------------------------- #
+import os
+import re
+import stat
+import fnmatch
+from collections import namedtuple
+
+# os.scandir is part of python 3.5+, the scandir module provides it for python 2.
+# Without either, fall back to listdir + lstat which gives the same results at the
+# cost of one lstat per entry.
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# A file found by scan_dir.  path is the full path, relPath is the path relative to
+# the scanned directory.
+ScanEntry = namedtuple('ScanEntry', ['path', 'relPath', 'name', 'size', 'mtime', 'isLink'])
+
+# Working files OpenVDM keeps in the cruise directory: SQLite databases along with
+# their -journal/-wal files.  They change while the workers run so they are never
+# hashed or transferred.
+internalFilePrefixes = ('.MD5_HashCache.db', '.DashboardData_Cache.db', '.TransferIndex_', '.TransferQueue_')
+
+
+class _DirEntry(object):
+
+    # Minimal stand-in for os.DirEntry used when scandir is not available
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self._lstat = None
+        self._stat = None
+
+    def stat(self, follow_symlinks=True):
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        if follow_symlinks and stat.S_ISLNK(self._lstat.st_mode):
+            if self._stat is None:
+                self._stat = os.stat(self.path)
+            return self._stat
+        return self._lstat
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self.stat(follow_symlinks=False).st_mode)
+
+    def is_dir(self, follow_symlinks=True):
+        try:
+            return stat.S_ISDIR(self.stat(follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+
+def _scandir(path):
+
+    if scandir:
+        return scandir(path)
+
+    return (_DirEntry(path, name) for name in os.listdir(path))
+
+
+def _scan_entry(sourceDir, entry, followLinks):
+
+    # Returns the ScanEntry for a directory entry, or None if it is not a file
+    isLink = entry.is_symlink()
+    if isLink and (not followLinks or entry.is_dir()):
+        return None
+
+    entryStat = entry.stat(follow_symlinks=followLinks)
+    return ScanEntry(entry.path, entry.path[len(sourceDir) + 1:], entry.name, entryStat.st_size, entryStat.st_mtime, isLink)
+
+
+def is_internalFile(name):
+
+    return name.startswith(internalFilePrefixes)
+
+
+def compile_filters(filters):
+
+    # Compiles a comma-separated string (or list) of fnmatch patterns into one
+    # regex.  Returns None for an empty filter, which matches nothing.
+    if not isinstance(filters, list):
+        filters = filters.split(',')
+
+    patterns = ['(?:' + fnmatch.translate(os.path.normcase(filt)) + ')' for filt in filters if filt]
+    if not patterns:
+        return None
+
+    return re.compile('|'.join(patterns))
+
+
+def match_filters(compiledFilters, name):
+
+    return compiledFilters is not None and compiledFilters.match(os.path.normcase(name)) is not None
+
+
+def compile_filterGroups(filterGroups):
+
+    # Compiles a list of (groupName, filters) pairs into one regex so a name can be
+    # tested against every group in a single match.  groupName must be a valid
+    # python identifier.  Groups are tried in order, the first match wins.
+    patterns = []
+    for (groupName, filters) in filterGroups:
+        compiledFilters = compile_filters(filters)
+        if compiledFilters:
+            patterns.append('(?P<' + groupName + '>' + compiledFilters.pattern + ')')
+
+    if not patterns:
+        return None
+
+    return re.compile('|'.join(patterns))
+
+
+def match_filterGroups(compiledFilterGroups, name):
+
+    # Returns the name of the first group matching name, or None
+    if compiledFilterGroups is None:
+        return None
+
+    match = compiledFilterGroups.match(os.path.normcase(name))
+    if match is None:
+        return None
+
+    return match.lastgroup
+
+
+def scan_dir(sourceDir, followLinks=True):
+
+    # Yields a ScanEntry for every file below sourceDir using the stat results
+    # returned with each directory entry.  Like os.walk, symlinked directories
+    # are not descended.  Symlinked files are returned with the size and mtime of
+    # their target unless followLinks is False, broken symlinks are skipped.
+    sourceDir = sourceDir.rstrip('/')
+    dirs = [sourceDir]
+
+    while dirs:
+        root = dirs.pop()
+
+        try:
+            entries = list(_scandir(root))
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                    continue
+
+                scanEntry = _scan_entry(sourceDir, entry, followLinks)
+
+            except OSError:
+                continue
+
+            if scanEntry:
+                yield scanEntry
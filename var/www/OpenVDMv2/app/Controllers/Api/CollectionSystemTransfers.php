@@ -54,6 +54,10 @@ class CollectionSystemTransfers extends Controller {
         echo json_encode($this->_collectionSystemTransfersModel->getCollectionSystemTransfer($id));
     }
     
+    public function getCollectionSystemTransferByName($name){
+        echo json_encode($this->_collectionSystemTransfersModel->getCollectionSystemTransferByName(urldecode($name)));
+    }
+    
     // getCollectionSystemTransfersStatuses - return the names and statuses of the collection system transfers.
 	public function getCollectionSystemTransfersStatuses() {
         echo json_encode($this->_collectionSystemTransfersModel->getCollectionSystemTransfersStatuses());
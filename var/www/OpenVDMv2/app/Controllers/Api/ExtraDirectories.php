@@ -21,9 +21,19 @@ class ExtraDirectories extends Controller {
         echo json_encode($this->_model->getExtraDirectory($id));
     }
 
+    public function getExtraDirectoryByName($name){
+
+        echo json_encode($this->_model->getExtraDirectoryByName(urldecode($name)));
+    }
+
     public function getRequiredExtraDirectories(){
 
         echo json_encode($this->_model->getRequiredExtraDirectories());
     }
 
+    public function getRequiredExtraDirectoryByName($name){
+
+        echo json_encode($this->_model->getRequiredExtraDirectoryByName(urldecode($name)));
+    }
+
 }
\ No newline at end of file
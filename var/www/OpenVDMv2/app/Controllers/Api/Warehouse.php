@@ -150,4 +150,46 @@ class Warehouse extends Controller {
     
     }
     
+    // getJobContext - return everything a worker needs to start a job in one call.
+    // $recordType (collectionSystemTransfer, cruiseDataTransfer or task) and $id
+    // optionally add the record the job is for.
+	public function getJobContext($recordType = '', $id = '') {
+
+        $extraDirectoriesModel = new \Models\Config\ExtraDirectories();
+
+        $response['cruiseID'] = $this->_warehouseModel->getCruiseID();
+        $response['cruiseStartDate'] = $this->_warehouseModel->getCruiseStartDate();
+        $response['cruiseEndDate'] = $this->_warehouseModel->getCruiseEndDate();
+        $response['warehouseConfig'] = $this->_warehouseModel->getShipboardDataWarehouseConfig();
+        $response['requiredExtraDirectories'] = $extraDirectoriesModel->getRequiredExtraDirectories();
+        $response['shipToShoreBWLimit'] = $this->_warehouseModel->getShipToShoreBWLimit();
+        $response['shipToShoreBWLimitStatus'] = $this->_warehouseModel->getShipToShoreBWLimitStatus();
+        $response['md5FilesizeLimit'] = $this->_warehouseModel->getMd5FilesizeLimit();
+        $response['md5FilesizeLimitStatus'] = $this->_warehouseModel->getMd5FilesizeLimitStatus();
+
+        if($this->_warehouseModel->getSystemStatus()) {
+            $response['systemStatus'] = "On";
+        } else {
+            $response['systemStatus'] = "Off";
+        }
+
+        $record = array();
+        if(strcmp($recordType, 'collectionSystemTransfer') === 0) {
+            $collectionSystemsTransfersModel = new \Models\Config\CollectionSystemTransfers();
+            $record = $collectionSystemsTransfersModel->getCollectionSystemTransfer($id);
+        } elseif(strcmp($recordType, 'cruiseDataTransfer') === 0) {
+            $cruiseDataTransfersModel = new \Models\Config\CruiseDataTransfers();
+            $record = $cruiseDataTransfersModel->getCruiseDataTransfer($id);
+        } elseif(strcmp($recordType, 'task') === 0) {
+            $tasksModel = new \Models\Config\Tasks();
+            $record = $tasksModel->getTask($id);
+        }
+
+        if(strcmp($recordType, '') !== 0) {
+            $response[$recordType] = count($record) > 0 ? $record[0] : false;
+        }
+
+        echo json_encode($response);
+    }
+    
 }
\ No newline at end of file
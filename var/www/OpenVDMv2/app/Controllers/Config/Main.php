@@ -193,10 +193,15 @@ class Main extends Controller {
         Url::redirect('config');
     }
     
-    public function rebuildDataDashboard() {
+    public function rebuildDataDashboard($force = false) {
 
         //$_warehouseModel = new \Models\Warehouse();
         $gmData['cruiseID'] = $this->_warehouseModel->getCruiseID();
+
+        # reprocess every file, ignoring the dashboard cache
+        if($force) {
+            $gmData['force'] = true;
+        }
         
         # create the gearman client
         $gmc= new \GearmanClient();
@@ -211,6 +216,11 @@ class Main extends Controller {
 
         Url::redirect('config');
     }
+
+    public function forceRebuildDataDashboard() {
+
+        $this->rebuildDataDashboard(true);
+    }
     
     public function setupNewCruise() {
 
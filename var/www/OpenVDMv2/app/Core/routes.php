@@ -25,6 +25,7 @@ Router::any('config/rebuildMD5Summary', '\Controllers\Config\Main@rebuildMD5Summ
 Router::any('config/rebuildTransferLogSummary', '\Controllers\Config\Main@rebuildTransferLogSummary');
 Router::any('config/rebuildCruiseDirectory', '\Controllers\Config\Main@rebuildCruiseDirectory');
 Router::any('config/rebuildDataDashboard', '\Controllers\Config\Main@rebuildDataDashboard');
+Router::any('config/forceRebuildDataDashboard', '\Controllers\Config\Main@forceRebuildDataDashboard');
 Router::any('config/editCruiseID', '\Controllers\Config\Main@editCruiseID');
 Router::any('config/editShipboardDataWarehouse', '\Controllers\Config\Main@editShipboardDataWarehouse');
 Router::any('config/login', '\Controllers\Config\Auth@login');
@@ -115,6 +116,8 @@ Router::any('api/warehouse/getCruiseSize', 'Controllers\Api\Warehouse@getCruiseS
 Router::any('api/warehouse/getCruiseStartDate', 'Controllers\Api\Warehouse@getCruiseStartDate');
 Router::any('api/warehouse/getCruiseEndDate', 'Controllers\Api\Warehouse@getCruiseEndDate');
 Router::any('api/warehouse/getFreeSpace', 'Controllers\Api\Warehouse@getFreeSpace');
+Router::any('api/warehouse/getJobContext', 'Controllers\Api\Warehouse@getJobContext');
+Router::any('api/warehouse/getJobContext/(:any)/(:num)', 'Controllers\Api\Warehouse@getJobContext');
 Router::any('api/warehouse/getMD5FilesizeLimit', 'Controllers\Api\Warehouse@getMD5FilesizeLimit');
 Router::any('api/warehouse/getMD5FilesizeLimitStatus', 'Controllers\Api\Warehouse@getMD5FilesizeLimitStatus');
 Router::any('api/warehouse/getShipboardDataWarehouseConfig', 'Controllers\Api\Warehouse@getShipboardDataWarehouseConfig');
@@ -125,6 +128,7 @@ Router::any('api/warehouse/getSystemStatus', 'Controllers\Api\Warehouse@getSyste
 
 Router::any('api/collectionSystemTransfers/getCollectionSystemTransfers', 'Controllers\Api\CollectionSystemTransfers@getCollectionSystemTransfers');
 Router::any('api/collectionSystemTransfers/getCollectionSystemTransfer/(:num)', 'Controllers\Api\CollectionSystemTransfers@getCollectionSystemTransfer');
+Router::any('api/collectionSystemTransfers/getCollectionSystemTransferByName/(:any)', 'Controllers\Api\CollectionSystemTransfers@getCollectionSystemTransferByName');
 Router::any('api/collectionSystemTransfers/getCollectionSystemTransfersStatuses', 'Controllers\Api\CollectionSystemTransfers@getCollectionSystemTransfersStatuses');
 Router::any('api/collectionSystemTransfers/setErrorCollectionSystemTransfer/(:num)', 'Controllers\Api\CollectionSystemTransfers@setErrorCollectionSystemTransfer');
 Router::any('api/collectionSystemTransfers/setRunningCollectionSystemTransfer/(:num)', 'Controllers\Api\CollectionSystemTransfers@setRunningCollectionSystemTransfer');
@@ -153,7 +157,9 @@ Router::any('api/dashboardData/getDashboardObjectQualityTestsByRawName/(:any)/(:
 
 Router::any('api/extraDirectories/getExtraDirectories', 'Controllers\Api\ExtraDirectories@getExtraDirectories');
 Router::any('api/extraDirectories/getExtraDirectory/(:num)', 'Controllers\Api\ExtraDirectories@getExtraDirectory');
+Router::any('api/extraDirectories/getExtraDirectoryByName/(:any)', 'Controllers\Api\ExtraDirectories@getExtraDirectoryByName');
 Router::any('api/extraDirectories/getRequiredExtraDirectories', 'Controllers\Api\ExtraDirectories@getRequiredExtraDirectories');
+Router::any('api/extraDirectories/getRequiredExtraDirectoryByName/(:any)', 'Controllers\Api\ExtraDirectories@getRequiredExtraDirectoryByName');
 
 Router::any('api/tasks/getTasks', 'Controllers\Api\Tasks@getTasks');
 Router::any('api/tasks/getTask/(:num)', 'Controllers\Api\Tasks@getTask');
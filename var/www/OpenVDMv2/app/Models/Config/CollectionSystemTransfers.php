@@ -17,6 +17,10 @@ class CollectionSystemTransfers extends Model {
         return $this->db->select("SELECT * FROM ".PREFIX."CollectionSystemTransfers WHERE collectionSystemTransferID = :id",array(':id' => $id));
     }
     
+    public function getCollectionSystemTransferByName($name){
+        return $this->db->select("SELECT * FROM ".PREFIX."CollectionSystemTransfers WHERE name = :name",array(':name' => $name));
+    }
+    
     public function insertCollectionSystemTransfer($data){
         $this->db->insert(PREFIX."CollectionSystemTransfers",$data);
     }
@@ -21,6 +21,10 @@ class ExtraDirectories extends Model {
         return $this->db->select("SELECT * FROM ".PREFIX."ExtraDirectories WHERE name = :name",array(':name' => $name));
     }
     
+    public function getRequiredExtraDirectoryByName($name){
+        return $this->db->select("SELECT * FROM ".PREFIX."ExtraDirectories WHERE name = :name AND required = :required",array(':name' => $name, ':required' => '1'));
+    }
+    
     public function insertExtraDirectory($data){
         $this->db->insert(PREFIX."ExtraDirectories",$data);
     }
@@ -8,6 +8,7 @@ class DashboardData extends Model {
 
     const CONFIG_FN = 'ovdmConfig.json';
     const MANIFEST_FN = 'manifest.json';
+    const MANIFEST_SHARD_PREFIX = 'manifest_';
     
     private $_cruiseDataDir;
     private $_manifestObj;
@@ -47,15 +48,7 @@ class DashboardData extends Model {
                         //Get the the directory that holds the DashboardData
                         for($i = 0; $i < sizeof($ovdmConfigJSON['extraDirectoriesConfig']); $i++){
                             if(strcmp($ovdmConfigJSON['extraDirectoriesConfig'][$i]['name'], 'Dashboard Data') === 0){
-                                $dataDashboardList = scandir($this->_cruiseDataDir . DIRECTORY_SEPARATOR . $this->_cruiseID . DIRECTORY_SEPARATOR . $ovdmConfigJSON['extraDirectoriesConfig'][$i]['destDir']);
-                                foreach ($dataDashboardList as $dataDashboardKey => $dataDashboardValue){
-                                    //If a manifest file is found, add CruiseID to output
-                                    if (in_array($dataDashboardValue,array(self::MANIFEST_FN))){
-                                        $manifestContents = file_get_contents($this->_cruiseDataDir . DIRECTORY_SEPARATOR . $this->_cruiseID . DIRECTORY_SEPARATOR . $ovdmConfigJSON['extraDirectoriesConfig'][$i]['destDir'] . DIRECTORY_SEPARATOR . self::MANIFEST_FN);
-					$this->_manifestObj = json_decode($manifestContents,true);
-                                        break;
-                                    }
-                                }
+                                $this->_manifestObj = $this->readManifestFiles($this->_cruiseDataDir . DIRECTORY_SEPARATOR . $this->_cruiseID . DIRECTORY_SEPARATOR . $ovdmConfigJSON['extraDirectoriesConfig'][$i]['destDir']);
                                 break;
                             }
                         }
@@ -66,6 +59,36 @@ class DashboardData extends Model {
         }
     }
 
+    //Reads manifest.json along with the per-collection system manifest shards
+    //(manifest_<destDir>.json).  An entry in a shard replaces the entry in
+    //manifest.json for the same raw data file.
+    private function readManifestFiles($dataDashboardDir) {
+
+        $manifestFiles = glob($dataDashboardDir . DIRECTORY_SEPARATOR . self::MANIFEST_SHARD_PREFIX . '*.json');
+        if ($manifestFiles === false) {
+            $manifestFiles = array();
+        }
+        if (is_file($dataDashboardDir . DIRECTORY_SEPARATOR . self::MANIFEST_FN)) {
+            array_unshift($manifestFiles, $dataDashboardDir . DIRECTORY_SEPARATOR . self::MANIFEST_FN);
+        }
+
+        if (sizeof($manifestFiles) == 0) {
+            return null;
+        }
+
+        $manifestObj = array();
+        foreach ($manifestFiles as $manifestFile) {
+            $manifestEntries = json_decode(file_get_contents($manifestFile),true);
+            if (is_array($manifestEntries)) {
+                foreach ($manifestEntries as $manifestEntry) {
+                    $manifestObj[$manifestEntry['raw_data']] = $manifestEntry;
+                }
+            }
+        }
+
+        return array_values($manifestObj);
+    }
+
     public function getDashboardDataTypes() {
 
         $dataTypes = array();
@@ -52,12 +52,12 @@ use Helpers\Session;
                         break;
                     case 2:
 ?>
-                        <div class="list-group-item"><?php echo $row->longName; ?><a href="<?php echo DIR . 'config/' . $row->name; ?>" class="pull-right btn btn-xs btn-primary btn-outline">Run</a></div>
+                        <div class="list-group-item"><?php echo $row->longName; ?><a href="<?php echo DIR . 'config/' . $row->name; ?>" class="pull-right btn btn-xs btn-primary btn-outline">Run</a><?php if(strcmp($row->name, "rebuildDataDashboard") == 0) { ?><a href="<?php echo DIR . 'config/forceRebuildDataDashboard'; ?>" class="pull-right btn btn-xs btn-primary btn-outline" style="margin-right: 5px;" title="Reprocess every file, ignoring the dashboard cache">Reprocess All</a><?php } ?></div>
  <?php
                         break;
                     case 3:
 ?>
-                        <div class="list-group-item"><?php echo $row->longName; ?><span class="pull-right"><i class="fa fa-warning text-danger"></i>&nbsp;&nbsp;<a href="<?php echo DIR . 'config/' . $row->name; ?>" class="btn btn-xs btn-primary btn-outline">Run</a></span></div>
+                        <div class="list-group-item"><?php echo $row->longName; ?><span class="pull-right"><i class="fa fa-warning text-danger"></i>&nbsp;&nbsp;<a href="<?php echo DIR . 'config/' . $row->name; ?>" class="btn btn-xs btn-primary btn-outline">Run</a></span><?php if(strcmp($row->name, "rebuildDataDashboard") == 0) { ?><a href="<?php echo DIR . 'config/forceRebuildDataDashboard'; ?>" class="pull-right btn btn-xs btn-primary btn-outline" style="margin-right: 5px;" title="Reprocess every file, ignoring the dashboard cache">Reprocess All</a><?php } ?></div>
  <?php
                         break;
                 }